@@ -8,7 +8,8 @@
 LogLens — Root-Cause Log Explorer (CLI)
 
 Features
-- Load logs from JSONL or plain text (best-effort parse).
+- Load logs from JSONL, plain text (best-effort parse), logfmt, RFC 5424 syslog,
+  or nginx/Envoy access logs; the format is detected per line.
 - Filter by time window, level, keyword(s), request_id, and latency threshold.
 - Quick stats: counts by level, top messages, latency distribution.
 - Spike scan: finds minutes with unusually high ERROR/WARN counts.
@@ -23,14 +24,66 @@ Plain text best-effort expected pattern (flexible):
 
 from __future__ import annotations
 import argparse
+import bz2
+import glob
+import gzip
+import hashlib
+import heapq
+import io
 import json
+import math
+import mmap
+import os
+import random
 import re
-from collections import Counter, defaultdict
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import chain, islice, repeat
 from pathlib import Path
 from statistics import median
-from typing import Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:  # optional, several times faster than json on wide payloads
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional, for .zst input
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """numpy for the columnar fast paths, or None; imported on first use since it adds ~0.1 s to startup."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def _pyarrow():
+    """pyarrow with its parquet and compute modules loaded, or None; only Parquet input/output needs it."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
 
 
 ISO_RE = re.compile(
@@ -38,6 +91,27 @@ ISO_RE = re.compile(
 )
 REQ_RE = re.compile(r"(?:req(?:uest)?[=_:\s])(?P<rid>[A-Za-z0-9\-\_]+)", re.I)
 LAT_RE = re.compile(r"(?:latency|lat|dur|duration)[=\s:~]*(?P<ms>\d+)\s*ms", re.I)
+# whitespace json.loads skips before a value
+JSON_WS = " \t\n\r"
+
+
+def json_loads(line: str):
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass  # NaN, huge ints, lone surrogates: let json decide
+    return json.loads(line)
+
+
+def json_dumps(obj) -> str:
+    """Compact JSON text (via orjson when available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. ints beyond 64 bits: let json decide
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
 
 @dataclass
@@ -48,11 +122,16 @@ class LogEntry:
     request_id: Optional[str] = None
     latency_ms: Optional[int] = None
     raw: str = ""
+    # id in TEMPLATES, filled in the first time the entry is grouped
+    template_id: Optional[int] = field(default=None, compare=False, repr=False)
 
     @staticmethod
     def from_jsonl(line: str) -> Optional["LogEntry"]:
+        # only an object can yield an entry, so text lines skip the decode
+        if line.lstrip(JSON_WS)[:1] != "{":
+            return None
         try:
-            obj = json.loads(line)
+            obj = json_loads(line)
             ts = parse_ts(obj.get("timestamp") or obj.get("time") or obj.get("ts"))
             if not ts:
                 return None
@@ -95,10 +174,137 @@ class LogEntry:
         msg = rest
         return LogEntry(ts, level, msg, rid, lat, raw=line.rstrip("\n"))
 
+    @staticmethod
+    def from_logfmt(line: str) -> Optional["LogEntry"]:
+        if not LOGFMT_HEAD_RE.match(line):
+            return None
+        kv = {}
+        for key, value in LOGFMT_RE.findall(line):
+            if value[:1] == '"':
+                value = _UNESCAPE_RE.sub(r"\1", value[1:-1])
+            kv[key] = value
+        ts = parse_ts(kv.get("timestamp") or kv.get("time") or kv.get("ts"))
+        if not ts:
+            return None
+        level = (kv.get("level") or kv.get("lvl") or kv.get("severity") or "INFO").upper()
+        msg = kv.get("message", kv.get("msg", ""))
+        rid = kv.get("request_id") or kv.get("req_id") or kv.get("rid")
+        lat = None
+        for key in ("latency_ms", "lat_ms", "duration_ms", "latency", "duration", "took"):
+            if key in kv:
+                lat = _duration_ms(kv[key], "ms" if key.endswith("_ms") else None)
+                break
+        return LogEntry(ts, level, msg, rid, lat, raw=line.rstrip("\n"))
+
+    @staticmethod
+    def from_syslog(line: str) -> Optional["LogEntry"]:
+        """RFC 5424; the level comes from the PRI severity."""
+        m = SYSLOG_RE.match(line)
+        if not m:
+            return None
+        ts = parse_ts(m.group("ts"))
+        if not ts:
+            return None
+        level = SYSLOG_LEVELS[int(m.group("pri")) & 7]
+        msg = (m.group("msg") or "").lstrip("\ufeff")
+        r = SYSLOG_RID_RE.search(m.group("sd")) or REQ_RE.search(msg)
+        rid = r.group("rid") if r else None
+        l = LAT_RE.search(msg)
+        lat = int(l.group("ms")) if l else None
+        return LogEntry(ts, level, msg, rid, lat, raw=line.rstrip("\n"))
+
+    @staticmethod
+    def from_access(line: str) -> Optional["LogEntry"]:
+        """
+        nginx/Apache combined format (optionally followed by request_time=/rt=
+        in seconds and request_id=) or Envoy's default access log format.
+        The message is "METHOD /path STATUS"; the level follows the status.
+        """
+        if line[:1] == "[":
+            m = ENVOY_RE.match(line)
+            if not m:
+                return None
+            ts = parse_ts(m.group("ts"))
+            rid = m.group("rid")
+            lat = int(m.group("dur"))
+        else:
+            m = NGINX_RE.match(line)
+            if not m:
+                return None
+            ts = _parse_clf_ts(m.group("ts"))
+            rest = m.group("rest")
+            r = ACCESS_RID_RE.search(rest)
+            rid = r.group("rid") if r else None
+            t = ACCESS_TIME_RE.search(rest)
+            lat = _duration_ms(t.group("s"), "s") if t else None
+        if not ts:
+            return None
+        status = int(m.group("status"))
+        level = "ERROR" if status >= 500 or status == 0 else "WARN" if status >= 400 else "INFO"
+        req = m.group("req").split()
+        target = req[1].split("?", 1)[0] if len(req) > 1 else ""
+        msg = " ".join(p for p in (req[0] if req else "", target, str(status)) if p)
+        return LogEntry(ts, level, msg, rid if rid != "-" else None, lat, raw=line.rstrip("\n"))
+
+
+LOGFMT_HEAD_RE = re.compile(r"[A-Za-z_][\w.-]*=")
+LOGFMT_RE = re.compile(r'([\w.-]+)=("(?:[^"\\]|\\.)*"|\S*)')
+_UNESCAPE_RE = re.compile(r"\\(.)")
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ms|us|µs|s)?")
+_DURATION_SCALE = {"ms": 1.0, "s": 1000.0, "us": 0.001, "µs": 0.001}
+
+SYSLOG_RE = re.compile(
+    r"<(?P<pri>\d{1,3})>1 (?P<ts>\S+) \S+ \S+ \S+ \S+ "
+    r"(?P<sd>-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (?P<msg>.*))?$"
+)
+SYSLOG_LEVELS = ("ERROR", "ERROR", "ERROR", "ERROR", "WARN", "INFO", "INFO", "DEBUG")
+SYSLOG_RID_RE = re.compile(r'\b(?:request_id|req_id|rid)="(?P<rid>[^"]*)"')
+
+NGINX_RE = re.compile(
+    r"(?!\d{4}-\d{2}-\d{2}T)[\w.:-]+ \S+ \S+ "
+    r"\[(?P<ts>\d{2}/[A-Za-z]{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})\] "
+    r'"(?P<req>(?:[^"\\]|\\.)*)" (?P<status>\d{3}) \S+(?P<rest>.*)$'
+)
+ENVOY_RE = re.compile(
+    r'\[(?P<ts>[^\]]+)\] "(?P<req>[^"]*)" (?P<status>\d+) \S+ \d+ \d+ (?P<dur>\d+) \S+ '
+    r'"[^"]*" "[^"]*" "(?P<rid>[^"]*)"'
+)
+ACCESS_RID_RE = re.compile(r'\b(?:request_id|req_id|rid)="?(?P<rid>[\w.-]+)')
+ACCESS_TIME_RE = re.compile(r"\b(?:request_time|rt)=(?P<s>\d+(?:\.\d+)?)")
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+
+def _parse_clf_ts(value: str) -> Optional[datetime]:
+    """'08/Nov/2025:13:30:01 +0100' (common log format) -> aware UTC datetime."""
+    try:
+        off = int(value[22:24]) * 60 + int(value[24:26])
+        tz = timezone(timedelta(minutes=-off if value[21] == "-" else off))
+        dt = datetime(int(value[7:11]), _MONTHS[value[3:6]], int(value[0:2]),
+                      int(value[12:14]), int(value[15:17]), int(value[18:20]), tzinfo=tz)
+    except (KeyError, ValueError):
+        return None
+    return dt.astimezone(timezone.utc)
+
+
+def _duration_ms(value: str, unit: Optional[str]) -> Optional[int]:
+    """'812', '812ms', '1.5s', '900us' -> whole milliseconds (`unit` applies when none is given)."""
+    m = _DURATION_RE.fullmatch(value.strip())
+    if not m:
+        return None
+    return int(float(m.group(1)) * _DURATION_SCALE[m.group(2) or unit or "ms"])
+
 
 def parse_ts(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
+    # Fast path for the usual "...Z" stamps: one C-level parse, no string
+    # rewriting and no timezone conversion (fromisoformat accepts "Z" on 3.11+).
+    if _FROMISO_Z and isinstance(value, str) and value[-1:] == "Z":
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
     v = value.strip().replace("Z", "+00:00")
     try:
         dt = datetime.fromisoformat(v)
@@ -109,20 +315,2035 @@ def parse_ts(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
-def load_entries(path: Path) -> List[LogEntry]:
-    entries: List[LogEntry] = []
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line.strip():
-                continue
-            e = LogEntry.from_jsonl(line)
-            if not e:
-                e = LogEntry.from_text(line)
-            if e:
-                entries.append(e)
-    entries.sort(key=lambda x: x.ts)
-    return entries
+_FROMISO_Z = sys.version_info >= (3, 11)
+
+
+CHUNK_BYTES = 32 * 1024 * 1024  # target size of one parallel parse task
+MERGE_CHUNK_BYTES = 4 * 1024 * 1024  # ... when several files are merged (each keeps parsed chunks around)
+
+
+# Line parsers in priority order. Each one rejects (returns None) lines that
+# do not start the way its format does, so at most one of them accepts a
+# line and the order never changes the result, only the cost.
+PARSERS: Dict[str, Callable[[str], Optional[LogEntry]]] = {
+    "jsonl": LogEntry.from_jsonl,
+    "text": LogEntry.from_text,
+    "logfmt": LogEntry.from_logfmt,
+    "syslog": LogEntry.from_syslog,
+    "access": LogEntry.from_access,
+}
+
+
+def register_parser(name: str, parse: Callable[[str], Optional[LogEntry]]) -> None:
+    """Add a format; it must reject lines that the existing parsers accept."""
+    PARSERS[name] = parse
+
+
+def parse_line(line: str) -> Optional[LogEntry]:
+    for parse in PARSERS.values():
+        e = parse(line)
+        if e:
+            return e
+    return None
+
+
+class LineParser:
+    """
+    parse_line() that remembers which format the last line had and tries that
+    parser first, so a file is sniffed once from its first parsable line and
+    again only when a line stops matching (mixed or concatenated files).
+    """
+
+    __slots__ = ("current",)
+
+    def __init__(self):
+        self.current: Optional[Callable[[str], Optional[LogEntry]]] = None
+
+    def __call__(self, line: str) -> Optional[LogEntry]:
+        current = self.current
+        if current is not None:
+            e = current(line)
+            if e:
+                return e
+        for parse in PARSERS.values():
+            if parse is not current:
+                e = parse(line)
+                if e:
+                    self.current = parse
+                    return e
+        return None
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[LogEntry]:
+    parse = LineParser()
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        e = parse(line)
+        if e:
+            yield e
+
+
+class LinePrefilter:
+    """
+    Byte-level pre-check applied before a line is decoded or parsed.
+    It is conservative: it only rejects lines that filter_entries() would drop
+    anyway (wrong level, or a UTC timestamp outside since/until). Anything it
+    cannot judge cheaply (non-ASCII, escapes, nested JSON, offsets) passes, and
+    so do formats whose level is derived rather than written (syslog, access).
+    """
+
+    def __init__(
+        self,
+        levels: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        lvset = {lv.upper() for lv in (levels or [])}
+        # entries without a level default to INFO, and JSON null becomes NONE
+        if lvset and all(lv.isascii() and lv.isalpha() for lv in lvset) and not lvset & {"INFO", "NONE"}:
+            alts = b"|".join(re.escape(lv.encode()) for lv in sorted(lvset))
+            self.level_re = re.compile(alts, re.I)
+        else:
+            self.level_re = None
+        self.since = _ts_key(since) if since else None
+        self.until = _ts_key(until) if until else None
+
+    @classmethod
+    def build(cls, levels=None, since=None, until=None) -> Optional["LinePrefilter"]:
+        pf = cls(levels, since, until)
+        if pf.level_re is None and pf.since is None and pf.until is None:
+            return None
+        return pf
+
+    def __call__(self, raw: bytes) -> bool:
+        if not raw.isascii() or b"\\" in raw:
+            return True
+        head = raw.lstrip()[:1]
+        text = head != b"{" and _TEXT_HEAD_RE.match(raw) is not None
+        if not (text or head == b"{" or _LOGFMT_HEAD_RE.match(raw)):
+            return True
+        if self.level_re is not None and not self.level_re.search(raw):
+            return False
+        if self.since is None and self.until is None:
+            return True
+        if head == b"{":
+            if raw.count(b"{") != 1 or raw.count(b'"timestamp"') != 1:
+                return True
+            m = _JSON_TS_RE.search(raw)
+            if not m:
+                return True
+            key = m.group(1)
+        elif text:
+            # text lines only parse with the timestamp at column 0 (always UTC)
+            key = raw[:19]
+        else:
+            return True
+        if self.since is not None and key < self.since:
+            return False
+        if self.until is not None and key > self.until:
+            return False
+        return True
+
+
+_TEXT_HEAD_RE = re.compile(rb"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+_LOGFMT_HEAD_RE = re.compile(LOGFMT_HEAD_RE.pattern.encode())
+_JSON_TS_RE = re.compile(
+    rb'"timestamp"\s*:\s*"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.\d+)?Z?"'
+)
+
+
+def _ts_key(dt: datetime) -> bytes:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S").encode()
+
+
+def iter_raw_lines(
+    path: Path,
+    start: int = 0,
+    end: Optional[int] = None,
+    prefilter: Optional[LinePrefilter] = None,
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (byte_offset, raw_line) for a byte range of the file through mmap.
+    Lines are split like text mode (\\n, \\r\\n and lone \\r); blank lines
+    and lines rejected by the prefilter are skipped without being decoded.
+    Compressed files are streamed instead; offsets then count decompressed bytes.
+    """
+    if compression_of(path) is not None:
+        with open_source(path) as src:
+            if start:
+                src.seek(start)
+            yield from _split_lines(src.readline, start, end, prefilter)
+        return
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(start)
+            yield from _split_lines(mm.readline, start, end, prefilter)
+
+
+def _split_lines(
+    readline: Callable[[], bytes],
+    pos: int,
+    end: Optional[int],
+    prefilter: Optional[LinePrefilter],
+) -> Iterator[Tuple[int, bytes]]:
+    while end is None or pos < end:
+        raw = readline()
+        if not raw:
+            break
+        nxt = pos + len(raw)
+        # trailing \r/\n only ever leave blank lines behind, which are skipped
+        raw = raw.rstrip(b"\r\n")
+        if b"\r" in raw:
+            parts = []
+            for part in raw.split(b"\r"):
+                parts.append((pos, part))
+                pos += len(part) + 1
+        else:
+            parts = ((pos, raw),)
+        for off, part in parts:
+            if not part.strip():
+                continue
+            if prefilter is not None and not prefilter(part):
+                continue
+            yield off, part
+        pos = nxt
+
+
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\x28\xb5\x2f\xfd", "zstd"))
+
+
+def compression_of(path: Path) -> Optional[str]:
+    """'gzip', 'bz2' or 'zstd' from the file's magic bytes (None for plain files)."""
+    with path.open("rb") as f:
+        head = f.read(4)
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def open_source(path: Path):
+    """Binary file object over the (decompressed) contents of `path`."""
+    kind = compression_of(path)
+    if kind is None:
+        return path.open("rb")
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "bz2":
+        return bz2.open(path, "rb")
+    if zstandard is None:
+        raise RuntimeError(f"{path}: reading zstd input needs the 'zstandard' package")
+    reader = zstandard.ZstdDecompressor().stream_reader(path.open("rb"), read_across_frames=True, closefd=True)
+    return io.BufferedReader(reader)
+
+
+def map_source(path: Path):
+    """Random-access bytes of the (decompressed) file: an mmap, or an in-memory copy for compressed input."""
+    if compression_of(path) is None:
+        with path.open("rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with open_source(path) as src:
+        return src.read()
+
+
+def iter_lines(
+    path: Path,
+    start: int = 0,
+    end: Optional[int] = None,
+    prefilter: Optional[LinePrefilter] = None,
+) -> Iterator[str]:
+    """Decoded view of iter_raw_lines(); only lines that pass the prefilter are decoded."""
+    for _, raw in iter_raw_lines(path, start, end, prefilter):
+        yield raw.decode("utf-8", errors="replace")
+
+
+def iter_entries(
+    path: Path,
+    workers: int = 1,
+    prefilter: Optional[LinePrefilter] = None,
+    span: Optional[Tuple[int, int]] = None,
+) -> Iterator[LogEntry]:
+    """
+    Yield parsed entries in file order, one line at a time (constant memory).
+    `span` restricts parsing to a line-aligned (start, end) byte range.
+    """
+    if workers > 1:
+        for part in _parallel_parse(path, workers, sort=False, prefilter=prefilter, span=span):
+            yield from part
+        return
+    start, end = span or (0, None)
+    yield from parse_lines(iter_lines(path, start, end, prefilter=prefilter))
+
+
+def load_entries(
+    path: Path,
+    workers: int = 1,
+    prefilter: Optional[LinePrefilter] = None,
+    span: Optional[Tuple[int, int]] = None,
+) -> List[LogEntry]:
+    if workers > 1:
+        # each worker returns a time-sorted chunk; merge keeps ties in file order
+        parts = _parallel_parse(path, workers, sort=True, prefilter=prefilter, span=span)
+        return list(heapq.merge(*parts, key=lambda x: x.ts))
+    entries = list(iter_entries(path, prefilter=prefilter, span=span))
+    entries.sort(key=lambda x: x.ts)
+    return entries
+
+
+SEEK_GRANULE = 64 * 1024  # stop bisecting below this many bytes and just read
+SEEK_PROBE_LINES = 64  # lines tried per probe before giving up on a region
+
+
+def seek_time_range(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    slack: timedelta = timedelta(seconds=60),
+) -> Tuple[int, int]:
+    """
+    Binary-search a (nearly) time-ordered file for the line-aligned byte span
+    covering [since - slack, until + slack], probing timestamps at midpoints.
+    Entries displaced by more than `slack` from their sorted position can fall
+    outside the span; everything inside still goes through the normal filters.
+    """
+    size = path.stat().st_size
+    if not size or (since is None and until is None):
+        return 0, size
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start, end = 0, size
+        if since is not None:
+            lo_us = to_epoch_us(since - slack)
+            lo, _ = _bisect_offset(mm, lambda t: t < lo_us, 0, size)
+            start = mm.rfind(b"\n", 0, lo) + 1
+        if until is not None:
+            hi_us = to_epoch_us(until + slack)
+            _, hi = _bisect_offset(mm, lambda t: t <= hi_us, start, size)
+            end = _next_line_start(mm, hi)
+    return start, max(start, end)
+
+
+def _next_line_start(mm: mmap.mmap, pos: int) -> int:
+    if pos <= 0:
+        return 0
+    nl = mm.find(b"\n", pos - 1)
+    return len(mm) if nl < 0 else nl + 1
+
+
+def _probe_ts(mm: mmap.mmap, pos: int, limit: int) -> Optional[Tuple[int, int]]:
+    """(line_start, epoch_us) of the first parsable line starting in [pos, limit)."""
+    ls = _next_line_start(mm, pos)
+    for _ in range(SEEK_PROBE_LINES):
+        if ls >= limit:
+            return None
+        nl = mm.find(b"\n", ls)
+        le = len(mm) if nl < 0 else nl
+        e = parse_line(mm[ls:le].rstrip(b"\r").decode("utf-8", errors="replace"))
+        if e:
+            return ls, to_epoch_us(e.ts)
+        ls = le + 1
+    return None
+
+
+def _bisect_offset(mm: mmap.mmap, before, lo: int, hi: int) -> Tuple[int, int]:
+    """Narrow [lo, hi] around the first line whose timestamp fails `before`."""
+    while hi - lo > SEEK_GRANULE:
+        mid = (lo + hi) // 2
+        probe = _probe_ts(mm, mid, hi)
+        if probe is None:
+            hi = mid
+        elif before(probe[1]):
+            lo = probe[0]
+        else:
+            hi = mid
+    return lo, hi
+
+
+def chunk_ranges(path: Path, parts: int, span: Optional[Tuple[int, int]] = None) -> List[Tuple[int, int]]:
+    """Split a file (or a line-aligned span of it) into ~equal (start, end) byte ranges that begin on a line."""
+    start, size = span or (0, path.stat().st_size)
+    step = max((size - start) // max(parts, 1), 1)
+    bounds = [start]
+    with path.open("rb") as f:
+        pos = start + step
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # advance to the start of the next line
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += step
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _parse_range(task: Tuple[Path, int, int, bool, Optional[LinePrefilter]]) -> List[LogEntry]:
+    path, start, end, sort, prefilter = task
+    entries = list(parse_lines(iter_lines(path, start, end, prefilter)))
+    if sort:
+        entries.sort(key=lambda x: x.ts)
+    return entries
+
+
+def _parallel_parse(
+    path: Path,
+    workers: int,
+    sort: bool,
+    prefilter: Optional[LinePrefilter] = None,
+    span: Optional[Tuple[int, int]] = None,
+) -> Iterator[List[LogEntry]]:
+    """Parse newline-aligned byte ranges in a process pool, yielding results in file order."""
+    kind = compression_of(path)
+    if kind is not None:
+        yield from _parallel_parse_compressed(path, kind, workers, sort, prefilter)
+        return
+    start, end = span or (0, path.stat().st_size)
+    ranges = chunk_ranges(path, max(workers, -(-(end - start) // CHUNK_BYTES)), (start, end))
+    tasks = [(path, a, b, sort, prefilter) for a, b in ranges]
+    if sort:
+        # a global merge needs every chunk anyway
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from list(pool.map(_parse_range, tasks))
+        return
+    # keep at most 2 tasks per worker in flight so memory stays bounded
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for task in tasks:
+            pending.append(pool.submit(_parse_range, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def compressed_blocks(path: Path, kind: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    (start, end) byte ranges of independently decompressible members, read
+    from the container without decompressing: BGZF blocks (gzip members
+    carrying their size in a "BC" extra field) or frames listed in a seekable
+    zstd seek table. None when the file has no such layout.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if kind == "gzip":
+            blocks, pos = [], 0
+            while pos < size:
+                f.seek(pos)
+                head = f.read(18)
+                bsize = _bgzf_block_size(head)
+                if bsize is None:
+                    return None
+                blocks.append((pos, min(pos + bsize, size)))
+                pos += bsize
+            return blocks
+        if kind == "zstd" and size >= 17:
+            f.seek(size - 9)
+            frames, flags, magic = struct.unpack("<IBI", f.read(9))
+            if magic != _SEEKABLE_ZSTD_MAGIC:
+                return None
+            entry = 12 if flags & 0x80 else 8
+            table = size - 9 - frames * entry
+            if table < 8:
+                return None
+            f.seek(table)
+            raw = f.read(frames * entry)
+            blocks, pos = [], 0
+            for i in range(frames):
+                (csize,) = struct.unpack_from("<I", raw, i * entry)
+                blocks.append((pos, pos + csize))
+                pos += csize
+            return blocks
+    return None
+
+
+_SEEKABLE_ZSTD_MAGIC = 0x8F92EAB1
+
+
+def _bgzf_block_size(head: bytes) -> Optional[int]:
+    # gzip header with FEXTRA, XLEN=6 and a single "BC" subfield holding BSIZE-1
+    if len(head) < 18 or head[:4] != b"\x1f\x8b\x08\x04" or head[12:14] != b"BC":
+        return None
+    return struct.unpack_from("<H", head, 16)[0] + 1
+
+
+def _decompress_range(task: Tuple[Path, str, int, int, bool, Optional[LinePrefilter]]):
+    """
+    Decompress and parse one group of members. Lines may straddle groups, so
+    the bytes before the first newline and after the last one are returned
+    unparsed for the parent to stitch: (head, entries, tail, has_newline).
+    """
+    path, kind, start, end, sort, prefilter = task
+    with path.open("rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if kind == "gzip":
+        data = gzip.decompress(data)
+    else:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        data = reader.read()
+    first = data.find(b"\n")
+    if first < 0:
+        return data, [], b"", False
+    last = data.rfind(b"\n")
+    entries = _parse_bytes(data[first + 1: last + 1], prefilter)
+    if sort:
+        entries.sort(key=lambda x: x.ts)
+    return data[: first + 1], entries, data[last + 1:], True
+
+
+def _parse_bytes(data: bytes, prefilter: Optional[LinePrefilter]) -> List[LogEntry]:
+    lines = _split_lines(io.BytesIO(data).readline, 0, None, prefilter)
+    return list(parse_lines(raw.decode("utf-8", errors="replace") for _, raw in lines))
+
+
+def _parallel_parse_compressed(
+    path: Path,
+    kind: str,
+    workers: int,
+    sort: bool,
+    prefilter: Optional[LinePrefilter],
+) -> Iterator[List[LogEntry]]:
+    """
+    _parallel_parse() for BGZF / seekable zstd; other compressed files (one
+    gzip or bz2 stream) cannot be split and are parsed serially in batches.
+    """
+    blocks = compressed_blocks(path, kind)
+    if not blocks or (kind == "zstd" and zstandard is None):
+        it = parse_lines(iter_lines(path, prefilter=prefilter))
+        while True:
+            batch = list(islice(it, 65536))
+            if not batch:
+                return
+            if sort:
+                batch.sort(key=lambda x: x.ts)
+            yield batch
+    # groups of whole members, ~CHUNK_BYTES / 8 compressed (logs compress ~8x)
+    tasks, group_start, target = [], blocks[0][0], CHUNK_BYTES // 8
+    for a, b in blocks:
+        if b - group_start >= target:
+            tasks.append((path, kind, group_start, b, sort, prefilter))
+            group_start = b
+    if group_start < blocks[-1][1]:
+        tasks.append((path, kind, group_start, blocks[-1][1], sort, prefilter))
+    carry = b""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for head, entries, tail, has_newline in pool.map(_decompress_range, tasks):
+            carry += head
+            if has_newline:
+                # the line that straddled the previous group boundary
+                stitched = _parse_bytes(carry, prefilter)
+                if stitched:
+                    yield stitched
+                carry = tail
+            if entries:
+                yield entries
+    if carry:
+        stitched = _parse_bytes(carry, prefilter)
+        if stitched:
+            yield stitched
+
+
+def expand_sources(spec: Path) -> List[Path]:
+    """
+    A file, a directory (its files) or a glob pattern such as "logs/app.log*"
+    -> sorted list of log files. Hidden files and .llidx sidecars are left out.
+    """
+    if spec.is_dir():
+        paths = [p for p in spec.iterdir() if p.is_file()]
+    elif not spec.exists() and glob.has_magic(str(spec)):
+        paths = [Path(p) for p in glob.glob(str(spec)) if os.path.isfile(p)]
+    else:
+        return [spec]
+    return sorted(
+        p for p in paths
+        if not p.name.startswith(".") and not p.name.endswith((INDEX_SUFFIX, INDEX_SUFFIX + ".tmp"))
+    )
+
+
+def file_time_range(path: Path) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Epoch-us timestamps of the first and last parsable lines (each looked for
+    within SEEK_PROBE_LINES lines of its end of the file). The last one stays
+    None for compressed files, which cannot be read backwards.
+    """
+    if compression_of(path) is not None:
+        for _, raw in islice(iter_raw_lines(path), SEEK_PROBE_LINES):
+            e = parse_line(raw.decode("utf-8", errors="replace"))
+            if e:
+                return to_epoch_us(e.ts), None
+        return None, None
+    size = path.stat().st_size
+    if not size:
+        return None, None
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first = _probe_ts(mm, 0, size)
+        last = None
+        le = size
+        for _ in range(SEEK_PROBE_LINES):
+            if le <= 0:
+                break
+            ls = mm.rfind(b"\n", 0, le - 1) + 1 if mm[le - 1: le] == b"\n" else mm.rfind(b"\n", 0, le) + 1
+            e = parse_line(mm[ls:le].rstrip(b"\r\n").decode("utf-8", errors="replace"))
+            if e:
+                last = to_epoch_us(e.ts)
+                break
+            le = ls
+    return (first[1] if first else None), last
+
+
+def prune_sources(
+    paths: List[Path],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    slack: timedelta = timedelta(seconds=60),
+) -> List[Path]:
+    """
+    Drop files whose first/last timestamps put them entirely outside
+    [since, until]. Like --seek this assumes each file is (nearly) time-ordered;
+    `slack` is the tolerated disorder. Files without a parsable edge are kept.
+    """
+    if since is None and until is None:
+        return paths
+    lo = to_epoch_us(since - slack) if since is not None else None
+    hi = to_epoch_us(until + slack) if until is not None else None
+    kept = []
+    for path in paths:
+        first, last = file_time_range(path)
+        if hi is not None and first is not None and first > hi:
+            continue
+        if lo is not None and last is not None and last < lo:
+            continue
+        kept.append(path)
+    return kept
+
+
+def iter_sources(
+    paths: Sequence[Path],
+    workers: int = 1,
+    prefilter: Optional[LinePrefilter] = None,
+) -> Iterator[LogEntry]:
+    """
+    Entries of several files as one time-ordered stream, via a k-way heap
+    merge (ties keep path order); each file is assumed time-ordered on its
+    own. With workers, chunks of every file are parsed in one process pool
+    while the merge consumes them, with about two chunks per worker in
+    flight (at least one per file), so memory stays bounded.
+    """
+    if len(paths) == 1:
+        yield from iter_entries(paths[0], workers=workers, prefilter=prefilter)
+        return
+    if workers <= 1:
+        streams = [iter_entries(p, prefilter=prefilter) for p in paths]
+        yield from heapq.merge(*streams, key=lambda x: x.ts)
+        return
+    ahead = max(1, 2 * workers // len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        streams = [_pooled_entries(pool, path, prefilter, ahead) for path in paths]
+        yield from heapq.merge(*streams, key=lambda x: x.ts)
+
+
+def _source_ranges(path: Path, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, Optional[int]]]:
+    """Parallel parse tasks for one of several files: whole compressed files, plain ones in chunks."""
+    if compression_of(path) is not None:
+        return [(0, None)]
+    return chunk_ranges(path, max(1, -(-path.stat().st_size // chunk_bytes)))
+
+
+def _pooled_entries(
+    pool: ProcessPoolExecutor, path: Path, prefilter: Optional[LinePrefilter], ahead: int
+) -> Iterator[LogEntry]:
+    """Entries of `path` in file order; its first `ahead` chunks are submitted right away."""
+    tasks = iter([(path, a, b, False, prefilter) for a, b in _source_ranges(path, MERGE_CHUNK_BYTES)])
+    pending = deque(pool.submit(_parse_range, t) for t in islice(tasks, ahead))
+
+    def stream() -> Iterator[LogEntry]:
+        while pending:
+            part = pending.popleft().result()
+            for t in islice(tasks, 1):
+                pending.append(pool.submit(_parse_range, t))
+            yield from part
+
+    return stream()
+
+
+PARQUET_SUFFIX = ".parquet"
+PARQUET_ROW_GROUP = 128 * 1024  # rows per row group: the unit that --since/--until can skip
+PARQUET_COLUMNS = ("ts", "level", "template", "message", "request_id", "latency_ms")
+CONVERT_RUN_ROWS = 128 * 1024  # entries convert sorts in memory at a time
+_RUN_BATCH = 1024  # rows per row group (and read batch) of a spilled run while runs are merged
+_RUN_FANIN = 64  # runs merged at once (each holds an open file)
+
+
+def is_parquet(path: Path) -> bool:
+    return path.suffix.lower() == PARQUET_SUFFIX
+
+
+def _parquet_schema(pa):
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("level", text),
+        ("template", text),
+        ("message", pa.string()),
+        ("request_id", pa.string()),
+        ("latency_ms", pa.int64()),
+    ])
+
+
+def write_parquet(entries: Iterable[LogEntry], out: Path, row_group_size: int = PARQUET_ROW_GROUP) -> int:
+    """
+    Write entries (ideally in time order, so row groups cover disjoint time
+    ranges) as Parquet: UTC timestamps, dictionary-encoded level and message
+    template, the message, request id (as text) and latency. Returns the
+    number of rows written.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError("Parquet output needs the pyarrow package")
+    schema = _parquet_schema(pa)
+    rows = 0
+    entries = iter(entries)
+    with pa.parquet.ParquetWriter(str(out), schema, compression="zstd") as writer:
+        while True:
+            batch = list(islice(entries, row_group_size))
+            if not batch:
+                break
+            columns = [
+                pa.array([to_epoch_us(e.ts) for e in batch], pa.int64()).cast(schema.field("ts").type),
+                pa.array([e.level for e in batch], pa.string()).dictionary_encode(),
+                pa.array([normalize_message(e.message) for e in batch], pa.string()).dictionary_encode(),
+                pa.array([e.message for e in batch], pa.string()),
+                pa.array([None if e.request_id is None else str(e.request_id) for e in batch], pa.string()),
+                pa.array([e.latency_ms if isinstance(e.latency_ms, int) else None for e in batch], pa.int64()),
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=row_group_size)
+            rows += len(batch)
+    return rows
+
+
+def write_parquet_sorted(
+    entries: Iterable[LogEntry],
+    out: Path,
+    row_group_size: int = PARQUET_ROW_GROUP,
+    run_rows: int = CONVERT_RUN_ROWS,
+) -> int:
+    """
+    write_parquet() in time order (ties keep input order) for entries that
+    are not known to be sorted, holding about `run_rows` of them. A heap of
+    that many entries reorders them as they stream, which is exact for logs
+    that are only locally out of order. From the first entry that arrives
+    later than that, what was written becomes the first sorted run, the rest
+    is sorted in runs of `run_rows` spilled to temporary Parquet files next
+    to `out`, and the runs are merged.
+    """
+    entries = iter(entries)
+    tail: List[LogEntry] = []
+
+    def reordered() -> Iterator[LogEntry]:
+        heap: List[Tuple[datetime, int, LogEntry]] = []
+        last = None
+        for seq, e in enumerate(entries):
+            if last is not None and e.ts < last:
+                tail.extend(x for _, _, x in sorted(heap, key=lambda h: h[1]))
+                tail.append(e)
+                return
+            heapq.heappush(heap, (e.ts, seq, e))
+            if len(heap) > run_rows:
+                last, _, x = heapq.heappop(heap)
+                yield x
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    rows = write_parquet(reordered(), out, row_group_size)
+    if not tail:
+        return rows
+    rest = chain(tail, entries)
+    with tempfile.TemporaryDirectory(prefix=".loglens-", dir=out.parent) as tmp:
+        runs = [Path(tmp) / "run0.parquet"]
+        os.replace(out, runs[0])
+        while True:
+            run = sorted(islice(rest, run_rows), key=lambda x: x.ts)
+            if not run:
+                break
+            runs.append(Path(tmp) / f"run{len(runs)}.parquet")
+            write_parquet(run, runs[-1], _RUN_BATCH)
+            del run
+        while len(runs) > _RUN_FANIN:  # merge passes; groups stay in order so ties do too
+            groups = [runs[i: i + _RUN_FANIN] for i in range(0, len(runs), _RUN_FANIN)]
+            runs = [Path(tmp) / f"pass{len(groups)}-{i}.parquet" for i in range(len(groups))]
+            for group, merged in zip(groups, runs):
+                write_parquet(_merge_runs(group), merged, _RUN_BATCH)
+                for r in group:
+                    r.unlink()
+        return write_parquet(_merge_runs(runs), out, row_group_size)
+
+
+def _merge_runs(runs: Sequence[Path]) -> Iterator[LogEntry]:
+    return heapq.merge(*(iter_parquet(r, batch_size=_RUN_BATCH) for r in runs), key=lambda x: x.ts)
+
+
+def iter_parquet(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    levels: Optional[List[str]] = None,
+    messages: bool = True,
+    batch_size: int = PARQUET_ROW_GROUP,
+) -> Iterator[LogEntry]:
+    """
+    Entries of a file written by write_parquet(), in file order. Row groups
+    whose timestamp statistics fall outside [since, until] are not read, and
+    rows outside the window or with other `levels` are dropped on the Arrow
+    columns before any LogEntry is made. With messages=False the message
+    column is not read at all and entries carry their template as message
+    (enough for stats with the default regex templates, which it maps to
+    itself).
+    """
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError(f"{path}: reading Parquet needs the pyarrow package")
+    pc = pa.compute
+    f = pa.parquet.ParquetFile(str(path))
+    ts_index = f.schema_arrow.get_field_index("ts")
+    groups = []
+    for i in range(f.num_row_groups):
+        stats = f.metadata.row_group(i).column(ts_index).statistics
+        if stats is not None and stats.has_min_max:
+            if (since is not None and stats.max < since) or (until is not None and stats.min > until):
+                continue
+        groups.append(i)
+    columns = ["ts", "level", "message" if messages else "template", "request_id", "latency_ms"]
+    wanted = pa.array(sorted({lv.upper() for lv in levels}), pa.string()) if levels else None
+    ts_type = f.schema_arrow.field("ts").type
+    for batch in f.iter_batches(batch_size=batch_size, row_groups=groups, columns=columns):
+        ts = batch.column(0)
+        keep = None
+        if since is not None:
+            keep = pc.greater_equal(ts, pa.scalar(since, ts_type))
+        if until is not None:
+            upto = pc.less_equal(ts, pa.scalar(until, ts_type))
+            keep = upto if keep is None else pc.and_(keep, upto)
+        if wanted is not None:
+            match = pc.is_in(pc.utf8_upper(batch.column(1).cast(pa.string())), value_set=wanted)
+            keep = match if keep is None else pc.and_(keep, match)
+        if keep is not None:
+            batch = batch.filter(keep)
+        for us, level, msg, rid, lat in zip(
+            batch.column(0).cast(pa.int64()).to_pylist(), *(batch.column(c).to_pylist() for c in range(1, 5))
+        ):
+            yield LogEntry(from_epoch_us(us), level, msg, rid, lat)
+
+
+def iter_parquet_sources(paths: Sequence[Path], **kwargs) -> Iterator[LogEntry]:
+    """iter_parquet() over several files as one stream, merged by time (each file is assumed time-ordered)."""
+    if len(paths) == 1:
+        return iter_parquet(paths[0], **kwargs)
+    return heapq.merge(*(iter_parquet(p, **kwargs) for p in paths), key=lambda x: x.ts)
+
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+DB_BATCH = 50_000  # rows per executemany/transaction while ingesting
+
+_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS levels (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS templates (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS entries (
+    ts INTEGER NOT NULL,  -- epoch microseconds, UTC
+    level INTEGER NOT NULL REFERENCES levels (id),
+    template INTEGER NOT NULL REFERENCES templates (id),
+    message TEXT NOT NULL,
+    request_id,  -- no type affinity: ids from JSON keep their type
+    latency_ms INTEGER
+);
+"""
+# built after the bulk load rather than maintained row by row
+_DB_INDEXES = """
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_level ON entries (level, ts);
+CREATE INDEX IF NOT EXISTS entries_request_id ON entries (request_id);
+CREATE INDEX IF NOT EXISTS entries_template ON entries (template);
+ANALYZE;
+"""
+
+
+def is_sqlite(path: Path) -> bool:
+    try:
+        with path.open("rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+def ingest_sqlite(entries: Iterable[LogEntry], db: Path, batch_size: int = DB_BATCH) -> int:
+    """
+    Append entries to a SQLite database (created if missing): levels and
+    regex templates are interned into lookup tables, rows go in with one
+    executemany per transaction of `batch_size`, and the indexes on ts,
+    level, request_id and template are built at the end. Returns the number
+    of rows added.
+    """
+    con = sqlite3.connect(str(db))
+    try:
+        con.execute("PRAGMA synchronous = OFF")  # a cache of the logs; rebuild it if the machine dies mid-ingest
+        con.executescript(_DB_SCHEMA)
+        levels = {name: i for i, name in con.execute("SELECT id, name FROM levels")}
+        templates = {text: i for i, text in con.execute("SELECT id, text FROM templates")}
+        rows = 0
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, batch_size))
+            if not batch:
+                break
+            new_levels: List[Tuple[int, str]] = []
+            new_templates: List[Tuple[int, str]] = []
+            values = []
+            for e in batch:
+                lv = levels.get(e.level)
+                if lv is None:
+                    lv = levels[e.level] = len(levels)
+                    new_levels.append((lv, e.level))
+                text = normalize_message(e.message)
+                tpl = templates.get(text)
+                if tpl is None:
+                    tpl = templates[text] = len(templates)
+                    new_templates.append((tpl, text))
+                rid, lat = e.request_id, e.latency_ms
+                if rid is not None and (isinstance(rid, bool) or not isinstance(rid, (str, int, float))):
+                    rid = json_dumps(rid)
+                values.append((
+                    to_epoch_us(e.ts), lv, tpl, e.message, rid,
+                    lat if isinstance(lat, int) and not isinstance(lat, bool) else None,
+                ))
+            with con:
+                con.executemany("INSERT INTO levels VALUES (?, ?)", new_levels)
+                con.executemany("INSERT INTO templates VALUES (?, ?)", new_templates)
+                con.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", values)
+            rows += len(batch)
+        con.executescript(_DB_INDEXES)
+    finally:
+        con.close()
+    return rows
+
+
+def iter_sqlite(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    levels: Optional[List[str]] = None,
+    request_id: Optional[str] = None,
+    min_latency: Optional[int] = None,
+    keywords: Optional[List[str]] = None,
+    messages: bool = True,
+    limit: Optional[int] = None,
+) -> Iterator[LogEntry]:
+    """
+    Entries of a database written by ingest_sqlite(), in time order (ingest
+    order on ties), streamed from a cursor. Every filter_entries() condition
+    becomes part of the WHERE clause, with the same semantics: keywords go
+    through a registered Python function rather than LIKE (which folds ASCII
+    case only), so `limit` can safely cap the rows the query returns.
+    messages=False reads the template instead of the message, as in
+    iter_parquet().
+    """
+    con = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        names = dict(con.execute("SELECT id, name FROM levels"))
+        where: List[str] = []
+        params: List = []
+        if since:
+            where.append("e.ts >= ?")
+            params.append(to_epoch_us(since))
+        if until:
+            where.append("e.ts <= ?")
+            params.append(to_epoch_us(until))
+        if levels:
+            wanted = {lv.upper() for lv in levels}
+            codes = [c for c, name in names.items() if name.upper() in wanted]
+            where.append(f"e.level IN ({', '.join('?' * len(codes))})")
+            params.extend(codes)
+        if request_id:
+            where.append("e.request_id = ?")
+            params.append(request_id)
+        if min_latency is not None:
+            # same as `(e.latency_ms or -1) >= min_latency`
+            where.append("coalesce(nullif(e.latency_ms, 0), -1) >= ?")
+            params.append(min_latency)
+        if keywords:
+            match = KeywordMatcher(keywords)
+            con.create_function("loglens_keywords", 1, lambda msg: match(msg), deterministic=True)
+            where.append("loglens_keywords(e.message)")
+        sql = "SELECT e.ts, e.level, " + ("e.message" if messages else "t.text") + ", e.request_id, e.latency_ms"
+        sql += " FROM entries e" + ("" if messages else " JOIN templates t ON t.id = e.template")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY e.ts, e.rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for ts, level, msg, rid, lat in con.execute(sql, params):
+            yield LogEntry(from_epoch_us(ts), names[level], msg, rid, lat)
+    finally:
+        con.close()
+
+
+def iter_sqlite_sources(paths: Sequence[Path], **kwargs) -> Iterator[LogEntry]:
+    """iter_sqlite() over several databases as one time-ordered stream."""
+    if len(paths) == 1:
+        return iter_sqlite(paths[0], **kwargs)
+    return heapq.merge(*(iter_sqlite(p, **kwargs) for p in paths), key=lambda x: x.ts)
+
+
+FOLLOW_BLOCK = 4 * 1024 * 1024  # most bytes follow() reads (and yields the lines of) at once
+
+
+def follow(path: Path, interval: float = 1.0, from_start: bool = False) -> Iterator[List[str]]:
+    """
+    Every `interval` seconds, yield the complete lines appended to `path`
+    since the previous poll (possibly none). A backlog (--from-start, or a
+    long stall) comes as several batches of at most FOLLOW_BLOCK bytes, back
+    to back, before the next sleep. Like `tail -F`: when the path is rotated
+    away the old file is drained and the new one read from its start, and a
+    file truncated in place is read again from the beginning.
+    """
+    f = None
+    partial = b""
+    skip_existing = not from_start
+    while True:
+        if f is None:
+            try:
+                f = path.open("rb")
+            except FileNotFoundError:
+                pass
+            else:
+                if skip_existing:
+                    f.seek(0, os.SEEK_END)
+        skip_existing = False  # a file that shows up later is new: read all of it
+        data = b""
+        caught_up = True
+        if f is not None:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                st = None
+            same = st is not None and st.st_ino == os.fstat(f.fileno()).st_ino
+            if same and st.st_size < f.tell():  # copytruncate
+                f.seek(0)
+                partial = b""
+            block = f.read(FOLLOW_BLOCK)
+            caught_up = len(block) < FOLLOW_BLOCK
+            data = partial + block
+            if not same and caught_up:  # rotated: the old file is drained, reopen the path
+                f.close()
+                f = None
+                data += b"\n"
+        cut = data.rfind(b"\n") + 1
+        data, partial = data[:cut], data[cut:]
+        lines = _split_lines(io.BytesIO(data).readline, 0, None, None)
+        yield [raw.decode("utf-8", errors="replace") for _, raw in lines]
+        if caught_up:
+            time.sleep(interval)
+
+
+NO_LATENCY = -(2 ** 63)  # EntryStore latency sentinel for "no latency"
+WARN_LEVELS = ("ERROR", "WARN", "WARNING")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+_MINUTE_US = 60_000_000
+
+
+def to_epoch_us(dt: datetime) -> int:
+    return (dt - _EPOCH) // _US
+
+
+def from_epoch_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+
+class EntryStore:
+    """
+    Columnar, memory-compact table of parsed entries (~40 bytes per line).
+    Timestamps are epoch microseconds, levels / request ids / message templates
+    are interned codes, and message/raw text stays in the source file as
+    (offset, length) until it is asked for.
+    """
+
+    __slots__ = (
+        "path", "ts", "level", "latency", "rid", "tpl", "offset", "length",
+        "level_names", "rid_values", "templates", "_ids", "is_sorted", "_mm", "index", "keywords", "rollups",
+    )
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.ts = array("q")
+        self.level = array("B")
+        self.latency = array("q")
+        self.rid = array("i")
+        self.tpl = array("I")
+        self.offset = array("Q")
+        self.length = array("I")
+        self.level_names: List[str] = []
+        self.rid_values: List = []
+        self.templates: List[str] = []
+        self._ids: Optional[Dict[str, Dict]] = {"level": {}, "rid": {}, "tpl": {}}
+        self.is_sorted = True
+        self._mm = None
+        self.index: Optional[StoreIndex] = None
+        self.keywords: Optional[KeywordIndex] = None
+        self.rollups: Optional[Rollups] = None  # of exactly these rows; select() does not carry it over
+
+    @classmethod
+    def build(
+        cls,
+        path: Path,
+        prefilter: Optional[LinePrefilter] = None,
+        span: Optional[Tuple[int, int]] = None,
+    ) -> "EntryStore":
+        store = cls(path)
+        start, end = span or (0, None)
+        parse = LineParser()
+        for offset, raw in iter_raw_lines(path, start, end, prefilter=prefilter):
+            e = parse(raw.decode("utf-8", errors="replace"))
+            if e:
+                store.append(e, offset, len(raw))
+        return store
+
+    def _intern(self, kind: str, table: List, value) -> int:
+        if self._ids is None:  # tables came from a sidecar; make them lists and rebuild lookups on first append
+            self.rid_values, self.templates = list(self.rid_values), list(self.templates)
+            table = {"level": self.level_names, "rid": self.rid_values, "tpl": self.templates}[kind]
+            self._ids = {
+                kind: _reverse_table(table)
+                for kind, table in (("level", self.level_names), ("rid", self.rid_values), ("tpl", self.templates))
+            }
+        ids = self._ids[kind]
+        try:
+            code = ids.get(value)
+        except TypeError:  # unhashable JSON value (list/dict); keep it, unshared
+            table.append(value)
+            return len(table) - 1
+        if code is None:
+            code = ids[value] = len(table)
+            table.append(value)
+        return code
+
+    def append(self, e: LogEntry, offset: int, length: int) -> None:
+        ts = to_epoch_us(e.ts)
+        if self.ts and ts < self.ts[-1]:
+            self.is_sorted = False
+        self.ts.append(ts)
+        lv = self._intern("level", self.level_names, e.level)
+        if lv > 255 and self.level.typecode == "B":
+            self.level = array("I", self.level)
+        self.level.append(lv)
+        lat = e.latency_ms
+        self.latency.append(lat if isinstance(lat, int) else NO_LATENCY)
+        self.rid.append(-1 if e.request_id is None else self._intern("rid", self.rid_values, e.request_id))
+        self.tpl.append(self._intern("tpl", self.templates, normalize_message(e.message)))
+        self.offset.append(offset)
+        self.length.append(length)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        for i in range(len(self)):
+            yield self.entry(i)
+
+    def raw(self, i: int) -> str:
+        if self._mm is None:
+            self._mm = map_source(self.path)
+        off = self.offset[i]
+        return self._mm[off: off + self.length[i]].decode("utf-8", errors="replace")
+
+    def entry(self, i: int) -> LogEntry:
+        # re-parsing the source line gives back exactly what the loader saw
+        return parse_line(self.raw(i))
+
+    def message(self, i: int) -> str:
+        return self.entry(i).message
+
+    def select(self, rows: Iterable[int]) -> "EntryStore":
+        """New store with the given rows (in that order); intern tables are shared."""
+        rows = rows if isinstance(rows, (list, range)) else list(rows)
+        out = EntryStore(self.path)
+        for name in ("ts", "level", "latency", "rid", "tpl", "offset", "length"):
+            col = getattr(self, name)
+            if isinstance(rows, range) and rows.step == 1:
+                setattr(out, name, col[rows.start: rows.stop])
+            else:
+                setattr(out, name, array(_typecode(col), [col[i] for i in rows]))
+        out.level_names, out.rid_values, out.templates = self.level_names, self.rid_values, self.templates
+        out._ids = self._ids
+        out.is_sorted = self.is_sorted and (isinstance(rows, range) or rows == sorted(rows))
+        out._mm = self._mm
+        return out
+
+    def sort(self) -> "EntryStore":
+        """Stable sort by timestamp (in place)."""
+        if self.is_sorted:
+            return self
+        # the permutation is an array, and columns are permuted one at a time
+        np = _numpy()
+        if np is not None:
+            perm = np.argsort(_np_column(self.ts), kind="stable")
+        else:
+            perm = array("I", sorted(range(len(self)), key=self.ts.__getitem__))
+        for name in ("ts", "level", "latency", "rid", "tpl", "offset", "length"):
+            col = getattr(self, name)
+            out = array(_typecode(col))
+            if np is not None:
+                out.frombytes(memoryview(_np_column(col)[perm]).cast("B"))
+            else:
+                out.extend(map(col.__getitem__, perm))
+            setattr(self, name, out)
+        self.is_sorted = True
+        return self
+
+    def filter(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        levels: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+        request_id: Optional[str] = None,
+        min_latency: Optional[int] = None,
+    ) -> "EntryStore":
+        """Same semantics as filter_entries(), evaluated on the columns."""
+        ts = self.ts
+        rows: Iterable[int] = range(len(self))
+        lo = to_epoch_us(since) if since else None
+        hi = to_epoch_us(until) if until else None
+        if self.is_sorted:
+            rows = range(
+                bisect_left(ts, lo) if lo is not None else 0,
+                bisect_right(ts, hi) if hi is not None else len(self),
+            )
+        else:
+            if lo is not None:
+                rows = [i for i in rows if ts[i] >= lo]
+            if hi is not None:
+                rows = [i for i in rows if ts[i] <= hi]
+        if levels:
+            lvset = {lv.upper() for lv in levels}
+            codes = {c for c, name in enumerate(self.level_names) if name.upper() in lvset}
+            if self.index is not None and isinstance(rows, range):
+                rows = self.index.postings("level", codes, rows)
+            else:
+                col = self.level
+                rows = [i for i in rows if col[i] in codes]
+        if request_id:
+            codes = _table_codes(self.rid_values, request_id)
+            if self.index is not None and isinstance(rows, range):
+                rows = self.index.postings("rid", codes, rows)
+            else:
+                col = self.rid
+                rows = [i for i in rows if col[i] in codes]
+        if min_latency is not None:
+            # matches `(e.latency_ms or -1) < min_latency`: 0 counts as missing
+            col = self.latency
+            rows = [i for i in rows if (col[i] if col[i] not in (NO_LATENCY, 0) else -1) >= min_latency]
+        if keywords:
+            kw = [k.lower() for k in keywords]
+            if self.keywords is not None:
+                rows = self.keywords.matching_rows(self, kw, rows)
+            else:
+                match = KeywordMatcher(kw)
+                rows = [i for i in rows if match(self.message(i))]
+        return self.select(rows)
+
+    def warn_minutes(self) -> Dict[datetime, int]:
+        if self.rollups is not None and 60 in self.rollups.resolutions:
+            return self.rollups.counts(60, levels=WARN_LEVELS)
+        codes = {c for c, name in enumerate(self.level_names) if name in WARN_LEVELS}
+        per_min: Dict[int, int] = defaultdict(int)
+        np = _numpy()
+        if np is not None and self.index is None and len(self):
+            is_warn = np.zeros(len(self.level_names), dtype=bool)
+            is_warn[sorted(codes)] = True
+            minutes = _np_column(self.ts)[is_warn[_np_column(self.level)]] // _MINUTE_US
+            if len(minutes):
+                lo = int(minutes.min())
+                if int(minutes.max()) - lo < 1 << 24:  # dense enough to bucket directly
+                    counts = np.bincount(minutes - lo)
+                    found = np.flatnonzero(counts)
+                    per_min.update(zip((found + lo).tolist(), counts[found].tolist()))
+                else:
+                    found, counts = np.unique(minutes, return_counts=True)
+                    per_min.update(zip(found.tolist(), counts.tolist()))
+        elif self.index is not None:
+            ts = self.ts
+            for i in self.index.postings("level", codes, range(len(self))):
+                per_min[ts[i] // _MINUTE_US] += 1
+        else:
+            for t, c in zip(self.ts, self.level):
+                if c in codes:
+                    per_min[t // _MINUTE_US] += 1
+        return {from_epoch_us(m * _MINUTE_US): n for m, n in per_min.items()}
+
+
+def load_store(
+    path: Path,
+    prefilter: Optional[LinePrefilter] = None,
+    span: Optional[Tuple[int, int]] = None,
+    rollups: bool = False,
+) -> EntryStore:
+    store = EntryStore.build(path, prefilter=prefilter, span=span).sort()
+    if rollups:
+        store.rollups = Rollups.build(store)
+    return store
+
+
+def _np_column(col):
+    """Zero-copy numpy view of an array('...') column or a memoryview section."""
+    return _numpy().frombuffer(col, dtype=getattr(col, "typecode", None) or col.format)
+
+
+def _np_code_counts(codes) -> Tuple[List[int], List[int], List[int]]:
+    """(code, count, first row) triples of an interned column, in first-row order: Counter(column) without the loop."""
+    np = _numpy()
+    counts = np.bincount(codes)
+    first = np.full(len(counts), len(codes), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(codes), dtype=np.int64))
+    present = np.flatnonzero(counts)
+    present = present[np.argsort(first[present], kind="stable")]
+    return present.tolist(), counts[present].tolist(), first[present].tolist()
+
+
+def _typecode(col) -> str:
+    # columns are arrays, or memoryviews over a memory-mapped .llidx sidecar
+    return col.typecode if isinstance(col, array) else col.format
+
+
+def _reverse_table(table: List) -> Dict:
+    ids: Dict = {}
+    for code, value in enumerate(table):
+        try:
+            ids.setdefault(value, code)
+        except TypeError:
+            pass
+    return ids
+
+
+ROLLUP_RESOLUTIONS = (1, 10, 60, 300, 3600)  # seconds; each one divides the next
+_SECOND_US = 1_000_000
+_ROLLUP_OPS = {"all": ("sum",), "level": ("sum",), "tpl": ("sum",), "latency": ("sum", "sum", "max")}
+
+
+class Rollups:
+    """
+    Pre-aggregated counts of an EntryStore at several time resolutions: in
+    total ("all"), per level and per template ("tpl"), plus the count, sum
+    and max of latencies ("latency"). Each kind is a CSR-style set of flat
+    arrays (offsets, buckets, values...): the non-empty buckets of code c are
+    rows offsets[c]:offsets[c + 1], in time order, and a bucket number is
+    epoch seconds // resolution. The finest resolution is counted from the
+    columns once and every coarser one is folded from the one below, so a
+    time window at any resolution is a bisect and an array slice instead of
+    a scan over the entries.
+    """
+
+    def __init__(self, resolutions: Sequence[int] = ROLLUP_RESOLUTIONS):
+        self.resolutions = tuple(resolutions)
+        if any(b % a for a, b in zip(self.resolutions, self.resolutions[1:])):
+            raise ValueError("each rollup resolution must divide the next")
+        self.level_names: List[str] = []
+        self.templates: List[str] = []
+        # resolution -> kind -> (offsets, buckets, *values)
+        self.tables: Dict[int, Dict[str, Tuple[array, ...]]] = {}
+
+    @classmethod
+    def build(cls, store: EntryStore, resolutions: Sequence[int] = ROLLUP_RESOLUTIONS) -> "Rollups":
+        out = cls(resolutions)
+        out.level_names, out.templates = store.level_names, store.templates
+        vectorized = _numpy() is not None and len(store) > 0
+        step = out.resolutions[0] * _SECOND_US
+        # kind -> (codes, buckets, *values), rows sorted by (code, bucket)
+        rows = _np_finest_rollup(store, step) if vectorized else _py_finest_rollup(store, step)
+        coarsen = _np_coarsen if vectorized else _py_coarsen
+        codes = {"all": 1, "level": len(store.level_names), "tpl": len(store.templates), "latency": 1}
+        prev = out.resolutions[0]
+        for res in out.resolutions:
+            if res != prev:
+                rows = {kind: coarsen(r, res // prev, _ROLLUP_OPS[kind]) for kind, r in rows.items()}
+                prev = res
+            out.tables[res] = {kind: _csr(r, codes[kind]) for kind, r in rows.items()}
+        return out
+
+    def _bounds(self, res: int, since: Optional[datetime], until: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+        step = res * _SECOND_US
+        return (
+            to_epoch_us(since) // step if since is not None else None,
+            to_epoch_us(until) // step if until is not None else None,
+        )
+
+    def _window(self, res: int, kind: str, code: int, lo: Optional[int], hi: Optional[int]) -> slice:
+        offsets, buckets = self.tables[res][kind][:2]
+        if not 0 <= code < len(offsets) - 1:
+            return slice(0, 0)
+        a, b = offsets[code], offsets[code + 1]
+        return slice(
+            bisect_left(buckets, lo, a, b) if lo is not None else a,
+            bisect_right(buckets, hi, a, b) if hi is not None else b,
+        )
+
+    def stamp(self, res: int, bucket: int) -> datetime:
+        return from_epoch_us(bucket * res * _SECOND_US)
+
+    def span(self, res: int) -> Optional[Tuple[int, int]]:
+        """First and last non-empty bucket at `res`, or None without entries."""
+        buckets = self.tables[res]["all"][1]
+        return (buckets[0], buckets[-1]) if buckets else None
+
+    def counts(
+        self,
+        res: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        levels: Optional[Iterable[str]] = None,
+        templates: Optional[Iterable[int]] = None,
+    ) -> Dict[datetime, int]:
+        """
+        Non-empty buckets (start time -> count) overlapping [since, until],
+        optionally only for some level names and/or template codes (summed).
+        """
+        keys: List[Tuple[str, int]] = []
+        if levels is not None:
+            wanted = {lv.upper() for lv in levels}
+            keys += [("level", c) for c, name in enumerate(self.level_names) if name.upper() in wanted]
+        if templates is not None:
+            keys += [("tpl", c) for c in templates]
+        if levels is None and templates is None:
+            keys = [("all", 0)]
+        lo, hi = self._bounds(res, since, until)
+        merged: Dict[int, int] = {}
+        for kind, code in keys:
+            _, buckets, values = self.tables[res][kind]
+            window = self._window(res, kind, code, lo, hi)
+            if len(keys) == 1:
+                merged = dict(zip(buckets[window], values[window]))
+                break
+            for b, n in zip(buckets[window], values[window]):
+                merged[b] = merged.get(b, 0) + n
+        return {self.stamp(res, b): merged[b] for b in sorted(merged)}
+
+    def latencies(
+        self, res: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[datetime, Tuple[int, int, int]]:
+        """Bucket start -> (count, sum, max) of latencies, non-empty buckets only."""
+        _, buckets, n, total, top = self.tables[res]["latency"]
+        window = self._window(res, "latency", 0, *self._bounds(res, since, until))
+        return {
+            self.stamp(res, b): row
+            for b, *row in zip(buckets[window], n[window], total[window], top[window])
+        }
+
+    def resolution_for(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None, max_buckets: int = 60
+    ) -> int:
+        """Finest resolution that shows the window in at most `max_buckets` buckets."""
+        for res in self.resolutions:
+            extent = self.span(res)
+            if extent is None:
+                return res
+            lo, hi = self._bounds(res, since, until)
+            lo = extent[0] if lo is None else lo
+            hi = extent[1] if hi is None else hi
+            if hi - lo + 1 <= max_buckets:
+                return res
+        return self.resolutions[-1]
+
+
+def _py_finest_rollup(store: EntryStore, step: int) -> Dict[str, Tuple[array, ...]]:
+    buckets = [t // step for t in store.ts]
+    rows: Dict[str, Tuple[array, ...]] = {}
+    for kind, column in (("all", repeat(0)), ("level", store.level), ("tpl", store.tpl)):
+        pairs = sorted(Counter(zip(column, buckets)).items())
+        rows[kind] = (
+            array("q", [c for (c, _), _ in pairs]),
+            array("q", [b for (_, b), _ in pairs]),
+            array("q", [n for _, n in pairs]),
+        )
+    stats: Dict[int, List[int]] = {}
+    for b, lat in zip(buckets, store.latency):
+        if lat == NO_LATENCY:
+            continue
+        row = stats.get(b)
+        if row is None:
+            stats[b] = [1, lat, lat]
+        else:
+            row[0] += 1
+            row[1] += lat
+            if lat > row[2]:
+                row[2] = lat
+    latency = tuple(array("q") for _ in range(5))
+    for b in sorted(stats):
+        for col, v in zip(latency, (0, b, *stats[b])):
+            col.append(v)
+    rows["latency"] = latency
+    return rows
+
+
+def _np_finest_rollup(store: EntryStore, step: int):
+    np = _numpy()
+    buckets = _np_column(store.ts) // step
+    lo = int(buckets.min())
+    width = int(buckets.max()) - lo + 1
+    rows = {}
+    for kind, column in (("all", None), ("level", store.level), ("tpl", store.tpl)):
+        codes = np.zeros(len(buckets), dtype=np.int64) if column is None else _np_column(column).astype(np.int64)
+        # one sort groups rows by (code, bucket)
+        keys, counts = np.unique(codes * width + (buckets - lo), return_counts=True)
+        codes, found = np.divmod(keys, width)
+        rows[kind] = (codes, found + lo, counts)
+    lat = _np_column(store.latency)
+    has = lat != NO_LATENCY
+    lb, lv = buckets[has], lat[has]
+    if not store.is_sorted:
+        order = np.argsort(lb, kind="stable")
+        lb, lv = lb[order], lv[order]
+    if len(lb):
+        starts = np.flatnonzero(np.r_[True, lb[1:] != lb[:-1]])
+        rows["latency"] = (
+            np.zeros(len(starts), dtype=np.int64),
+            lb[starts],
+            np.diff(np.r_[starts, len(lb)]),
+            np.add.reduceat(lv, starts),
+            np.maximum.reduceat(lv, starts),
+        )
+    else:
+        rows["latency"] = tuple(np.zeros(0, dtype=np.int64) for _ in range(5))
+    return rows
+
+
+def _py_coarsen(rows: Tuple[array, ...], factor: int, ops: Sequence[str]) -> Tuple[array, ...]:
+    """Fold (code, bucket, values...) rows into buckets `factor` times wider ("sum" or "max" per value)."""
+    codes, buckets, *values = rows
+    out = tuple(array("q") for _ in rows)
+    out_codes, out_buckets, out_values = out[0], out[1], out[2:]
+    for i, c in enumerate(codes):
+        b = buckets[i] // factor
+        if out_codes and out_codes[-1] == c and out_buckets[-1] == b:
+            for col, v, op in zip(out_values, values, ops):
+                col[-1] = col[-1] + v[i] if op == "sum" else max(col[-1], v[i])
+        else:
+            out_codes.append(c)
+            out_buckets.append(b)
+            for col, v in zip(out_values, values):
+                col.append(v[i])
+    return out
+
+
+def _np_coarsen(rows, factor: int, ops: Sequence[str]):
+    np = _numpy()
+    codes, buckets, *values = rows
+    wide = buckets // factor
+    if not len(wide):
+        return (codes, wide, *values)
+    starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (wide[1:] != wide[:-1])])
+    return (codes[starts], wide[starts], *(
+        (np.add if op == "sum" else np.maximum).reduceat(v, starts) for v, op in zip(values, ops)
+    ))
+
+
+def _csr(rows, n_codes: int) -> Tuple[array, ...]:
+    """(codes, buckets, *values) rows -> (offsets, buckets, *values) arrays."""
+    codes, *columns = rows
+    if isinstance(codes, array):
+        offsets = array("q", bytes(8 * (n_codes + 1)))
+        for c in codes:
+            offsets[c + 1] += 1
+        for c in range(n_codes):
+            offsets[c + 1] += offsets[c]
+        return (offsets, *columns)
+    np = _numpy()
+    offsets = np.searchsorted(codes, np.arange(n_codes + 1))
+    return tuple(_to_array(col) for col in (offsets, *columns))
+
+
+def _to_array(values) -> array:
+    out = array("q")
+    out.frombytes(values.astype("int64").tobytes())
+    return out
+
+
+INDEX_SUFFIX = ".llidx"
+_INDEX_MAGIC = b"LLIDX\x02\n\x00"
+_STORE_COLUMNS = ("ts", "level", "latency", "rid", "tpl", "offset", "length")
+_HEAD_BYTES = 1 << 20  # fingerprint: hash of the first MiB ...
+_TAIL_BYTES = 1 << 16  # ... and of the last 64 KiB covered by the index
+
+
+class StoreIndex:
+    """
+    Postings and cached aggregates for a time-sorted EntryStore; this is what
+    a .llidx sidecar holds next to the columns.
+
+    Sections: level_rows/level_starts and rid_rows/rid_starts (rows per
+    code, CSR layout), tpl_counts/tpl_first and lat_sorted (for summaries).
+    Time windows need no section: rows are time-sorted, so they bisect ts.
+    """
+
+    def __init__(self, sections: Dict[str, Sequence[int]]):
+        self.sections = sections
+
+    @classmethod
+    def build(cls, store: EntryStore) -> "StoreIndex":
+        n = len(store)
+        sections: Dict[str, Sequence[int]] = {}
+        for kind, col, ncodes in (
+            ("level", store.level, len(store.level_names)),
+            ("rid", store.rid, len(store.rid_values)),
+        ):
+            rows = array("I", sorted((i for i in range(n) if col[i] >= 0), key=col.__getitem__))
+            counts = Counter(col)
+            starts = array("Q", [0])
+            for code in range(ncodes):
+                starts.append(starts[-1] + counts.get(code, 0))
+            sections[kind + "_rows"], sections[kind + "_starts"] = rows, starts
+        tpl_counts = Counter(store.tpl)
+        tpl_first: Dict[int, int] = {}
+        for i, c in enumerate(store.tpl):
+            if c not in tpl_first:
+                tpl_first[c] = i
+        sections["tpl_counts"] = array("Q", [tpl_counts.get(c, 0) for c in range(len(store.templates))])
+        sections["tpl_first"] = array("Q", [tpl_first.get(c, n) for c in range(len(store.templates))])
+        sections["lat_sorted"] = array("q", sorted(v for v in store.latency if v != NO_LATENCY))
+        return cls(sections)
+
+    def postings(self, kind: str, codes: Iterable[int], within: range) -> List[int]:
+        """Sorted rows whose `kind` code is in `codes`, restricted to `within`."""
+        rows, starts = self.sections[kind + "_rows"], self.sections[kind + "_starts"]
+        out: List[int] = []
+        for c in codes:
+            out.extend(rows[starts[c]: starts[c + 1]])
+        out.sort()
+        return out[bisect_left(out, within.start): bisect_left(out, within.stop)]
+
+    def profile(self, store: EntryStore, normalizer=None) -> "Profile":
+        prof = Profile()
+        prof.total = len(store)
+        starts = self.sections["level_starts"]
+        rows = self.sections["level_rows"]
+        codes = [c for c in range(len(store.level_names)) if starts[c + 1] > starts[c]]
+        codes.sort(key=lambda c: rows[starts[c]])  # first occurrence, like Counter(rows)
+        prof.by_level = Counter({store.level_names[c]: starts[c + 1] - starts[c] for c in codes})
+        counts, first = self.sections["tpl_counts"], self.sections["tpl_first"]
+        codes = sorted((c for c in range(len(counts)) if counts[c]), key=first.__getitem__)
+        prof.set_store_messages(store, ((c, counts[c], first[c]) for c in codes), normalizer)
+        prof.latencies = self.sections["lat_sorted"]
+        prof.per_min = store.warn_minutes()
+        return prof
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class KeywordIndex:
+    """
+    Inverted index from lower-cased message tokens to the (sorted) store rows
+    that contain them, in CSR layout over a sorted vocabulary. Keyword lookups
+    stay substring matches: each word run of a keyword lies inside one token,
+    and is a whole token, a token prefix or a token suffix when the keyword
+    has non-word characters around it. Whole tokens and prefixes are bisects
+    in the vocabulary; everything else is found by one regex scan over the
+    vocabulary blob for all keywords. A single-word keyword is answered
+    exactly; others narrow candidates that are then checked on the message.
+    """
+
+    def __init__(self, vocab: Sequence[str], rows: Sequence[int], starts: Sequence[int]):
+        self.vocab = vocab if isinstance(vocab, StringTable) else StringTable(*StringTable.pack(vocab))
+        self.rows = rows
+        self.starts = starts
+
+    @classmethod
+    def build(cls, store: EntryStore) -> "KeywordIndex":
+        postings: Dict[str, array] = {}
+        for i in range(len(store)):
+            for tok in set(_TOKEN_RE.findall(store.message(i).lower())):
+                rows = postings.get(tok)
+                if rows is None:
+                    rows = postings[tok] = array("I")
+                rows.append(i)
+        vocab = sorted(postings)
+        rows, starts = array("I"), array("Q", [0])
+        for tok in vocab:
+            rows.extend(postings[tok])
+            starts.append(len(rows))
+        return cls(vocab, rows, starts)
+
+    def _token_ids(self, parts: Sequence[Tuple[str, bool, bool]]) -> List[List[int]]:
+        """Vocabulary ids for each (word, starts a token, ends a token) part."""
+        vocab = self.vocab
+        out: List[List[int]] = []
+        scan: List[Tuple[List[int], str, bool]] = []
+        for word, left, right in parts:
+            ids: List[int] = []
+            out.append(ids)
+            if not left:
+                scan.append((ids, word, right))
+                continue
+            lo = bisect_left(vocab, word)
+            if right:
+                ids.extend([lo] if lo < len(vocab) and vocab[lo] == word else [])
+            else:
+                ids.extend(range(lo, bisect_left(vocab, word + "\U0010ffff", lo)))
+        if scan:
+            # word characters never encode to the tag bytes, so no match spans two items
+            pattern = re.compile(_trie_pattern({word for _, word, _ in scan}).encode("utf-8"))
+            ends = vocab.ends
+            tokens = sorted({bisect_right(ends, m.start()) for m in pattern.finditer(bytes(vocab.blob))})
+            for ids, word, right in scan:
+                ids.extend(t for t in tokens if (vocab[t].endswith(word) if right else word in vocab[t]))
+        return out
+
+    def _postings(self, ids: Iterable[int]) -> Set[int]:
+        rows, starts = self.rows, self.starts
+        out: Set[int] = set()
+        for t in ids:
+            out.update(rows[starts[t]: starts[t + 1]])
+        return out
+
+    def matching_rows(self, store: EntryStore, keywords: List[str], rows: Iterable[int]) -> List[int]:
+        """Rows (restricted to `rows`) whose message contains any of the lower-cased keywords."""
+        allowed = rows if isinstance(rows, (range, set)) else set(rows)
+        specs = [(k, _keyword_parts(k)) for k in keywords]
+        found = iter(self._token_ids([part for _, parts in specs for part in parts]))
+        starts = self.starts
+        hits: Set[int] = set()
+        check: List[str] = []
+        candidates: Optional[Set[int]] = set()
+        for k, parts in specs:
+            ids = [next(found) for _ in parts]
+            if parts == [(k, False, False)]:  # one word: the postings are the answer
+                hits.update(r for r in self._postings(ids[0]) if r in allowed)
+                continue
+            check.append(k)
+            if candidates is None:
+                continue
+            # parts in most rows narrow nothing; their postings are not worth collecting
+            sizes = [sum(starts[t + 1] - starts[t] for t in part_ids) for part_ids in ids]
+            narrowing = [part_ids for n, part_ids in sorted(zip(sizes, ids), key=lambda p: p[0])
+                         if n <= len(allowed) // 2]
+            if not narrowing:
+                candidates = None
+                continue
+            cand = self._postings(narrowing[0])
+            for part_ids in narrowing[1:]:
+                cand &= self._postings(part_ids)
+            candidates.update(cand)
+        if not check:
+            return sorted(hits)
+        match = KeywordMatcher(check)
+        if candidates is None or len(candidates) > len(allowed) // 2:
+            # most rows need their message anyway: a plain scan is cheaper
+            return sorted(r for r in allowed if r in hits or match(store.message(r)))
+        hits.update(r for r in candidates if r not in hits and r in allowed and match(store.message(r)))
+        return sorted(hits)
+
+
+def _keyword_parts(keyword: str) -> List[Tuple[str, bool, bool]]:
+    """
+    Word runs of a lower-cased keyword, each with whether a non-word character
+    precedes / follows it there (so in a message it starts / ends a token).
+    """
+    return [(m.group(), m.start() > 0, m.end() < len(keyword)) for m in _TOKEN_RE.finditer(keyword)]
+
+
+class StringTable:
+    """
+    Read-only list of interned values as a .llidx sidecar stores them: one
+    blob of tagged UTF-8 items (b"\\0" + text, or b"\\1" + JSON for request
+    ids that are not strings) and the end offset of each. Items are decoded
+    when asked for, so opening a sidecar does not depend on the table size.
+    """
+
+    __slots__ = ("blob", "ends", "_cache")
+
+    def __init__(self, blob: Sequence[int], ends: Sequence[int]):
+        self.blob = blob
+        self.ends = ends
+        self._cache: Dict[int, object] = {}
+
+    @staticmethod
+    def pack(values: Sequence) -> Tuple[array, array]:
+        """(blob, ends) sections for `values`."""
+        if isinstance(values, StringTable):
+            blob = array("B")
+            blob.frombytes(values.blob)
+            return blob, array("Q", values.ends)
+        parts = [
+            b"\0" + v.encode("utf-8", errors="surrogatepass") if isinstance(v, str) else b"\1" + json.dumps(v).encode()
+            for v in values
+        ]
+        blob, ends, pos = array("B"), array("Q"), 0
+        for part in parts:
+            pos += len(part)
+            ends.append(pos)
+        blob.frombytes(b"".join(parts))
+        return blob, ends
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self.ends)
+        try:
+            return self._cache[i]
+        except KeyError:
+            pass
+        raw = bytes(self.blob[self.ends[i - 1] if i else 0: self.ends[i]])
+        value = raw[1:].decode("utf-8", errors="surrogatepass") if raw[:1] == b"\0" else json.loads(raw[1:])
+        self._cache[i] = value
+        return value
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self.ends)):
+            yield self[i]
+
+    def find(self, text: str) -> List[int]:
+        """Indexes of the items equal to the string `text`, by a search over the blob."""
+        needle, blob, ends = b"\0" + text.encode("utf-8", errors="surrogatepass"), bytes(self.blob), self.ends
+        out, pos = [], blob.find(needle)
+        while pos >= 0:
+            i = bisect_right(ends, pos)
+            if (ends[i - 1] if i else 0) == pos and ends[i] == pos + len(needle):
+                out.append(i)
+            pos = blob.find(needle, pos + 1)
+        return out
+
+
+def _table_codes(table: Sequence, value) -> Set[int]:
+    """Codes of `value` in an intern table (a list, or a StringTable from a sidecar)."""
+    if isinstance(table, StringTable) and isinstance(value, str):
+        return set(table.find(value))
+    return {c for c, v in enumerate(table) if v == value}
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _fingerprint(path: Path, size: int) -> Tuple[str, str]:
+    with path.open("rb") as f:
+        head = hashlib.sha1(f.read(min(size, _HEAD_BYTES))).hexdigest()
+        f.seek(max(size - _TAIL_BYTES, 0))
+        tail = hashlib.sha1(f.read(min(size, _TAIL_BYTES))).hexdigest()
+    return head, tail
+
+
+def _digest(path: Path, size: int) -> str:
+    """sha1 of the first `size` bytes, read in 1 MiB blocks."""
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        while size > 0:
+            block = f.read(min(size, 1 << 20))
+            if not block:
+                break
+            h.update(block)
+            size -= len(block)
+    return h.hexdigest()
+
+
+def _last_line_start(path: Path, size: int) -> int:
+    """Offset just past the last newline (== size if the file ends with one)."""
+    with path.open("rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos -= step
+    return 0
+
+
+def write_index(store: EntryStore, out: Path, st: Optional[os.stat_result] = None) -> None:
+    """Write the store (and its postings) as a .llidx sidecar; `st` is the source stat taken before parsing."""
+    st = st or store.path.stat()
+    head, tail = _fingerprint(store.path, st.st_size)
+    if store.index is None:
+        store.index = StoreIndex.build(store)
+    columns = {name: getattr(store, name) for name in _STORE_COLUMNS}
+    columns.update(store.index.sections)
+    tables = {"rid": store.rid_values, "tpl": store.templates}
+    if store.keywords is not None:
+        columns["tok_rows"], columns["tok_starts"] = store.keywords.rows, store.keywords.starts
+        tables["vocab"] = store.keywords.vocab
+    for kind, table in tables.items():  # string tables are sections too, not header JSON
+        columns[kind + "_blob"], columns[kind + "_ends"] = StringTable.pack(table)
+    header = {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "head": head,
+        "tail": tail,
+        "digest": _digest(store.path, st.st_size),
+        "tail_start": _last_line_start(store.path, st.st_size),
+        "level_names": list(store.level_names),
+        "sections": {},
+    }
+    pos = 0
+    for name, col in columns.items():
+        col = col if isinstance(col, array) else array(_typecode(col), col)
+        columns[name] = col
+        header["sections"][name] = [pos, col.typecode, len(col)]
+        pos += -(-len(col) * col.itemsize // 8) * 8
+    blob = json.dumps(header).encode()
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_INDEX_MAGIC + struct.pack("<Q", len(blob)) + blob)
+        f.write(b"\0" * (-f.tell() % 8))
+        base = f.tell()
+        for name, col in columns.items():
+            f.seek(base + header["sections"][name][0])
+            col.tofile(f)
+        f.write(b"\0" * (-f.tell() % 8))
+    os.replace(tmp, out)
+
+
+def read_index(path: Path, source: Path) -> Tuple[EntryStore, Dict]:
+    """Map a .llidx sidecar; columns are zero-copy memoryviews over the file."""
+    with path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:8] != _INDEX_MAGIC:
+        raise ValueError(f"{path}: not a LogLens index")
+    (hlen,) = struct.unpack("<Q", mm[8:16])
+    header = json.loads(mm[16: 16 + hlen])
+    base = 16 + hlen + (-(16 + hlen) % 8)
+    view = memoryview(mm)
+    cols = {}
+    for name, (off, typecode, count) in header["sections"].items():
+        size = array(typecode).itemsize
+        cols[name] = view[base + off: base + off + count * size].cast(typecode)
+    store = EntryStore(source)
+    for name in _STORE_COLUMNS:
+        setattr(store, name, cols.pop(name))
+    store.level_names = header["level_names"]
+    store.rid_values = StringTable(cols.pop("rid_blob"), cols.pop("rid_ends"))
+    store.templates = StringTable(cols.pop("tpl_blob"), cols.pop("tpl_ends"))
+    store._ids = None
+    if "vocab_blob" in cols:
+        vocab = StringTable(cols.pop("vocab_blob"), cols.pop("vocab_ends"))
+        store.keywords = KeywordIndex(vocab, cols.pop("tok_rows"), cols.pop("tok_starts"))
+    store.index = StoreIndex(cols)
+    return store, header
+
+
+def open_indexed(path: Path, keywords: bool = False, rollups: bool = False) -> EntryStore:
+    """
+    Load `path` through its .llidx sidecar: reuse it when size, mtime and the
+    head/tail hashes still match, extend it when the file was only appended
+    to, and (re)build it otherwise. Once the mtime has moved, only a full
+    hash of the indexed bytes proves that nothing before the old end of
+    file changed. With `keywords`, a token index is added
+    (and persisted) if the sidecar does not have one yet. If the sidecar
+    cannot be written the store is still returned.
+    """
+    idx = index_path(path)
+    st = path.stat()  # taken before parsing, so anything appended meanwhile is re-read next time
+    store = None
+    fresh = False
+    if idx.exists():
+        try:
+            store, header = read_index(idx, path)
+        except (OSError, ValueError, KeyError):
+            store = None
+    if store is not None:
+        old_size = header["size"]
+        if st.st_size < old_size or _fingerprint(path, old_size) != (header["head"], header["tail"]):
+            store = None
+        elif st.st_size == old_size and st.st_mtime_ns == header["mtime_ns"]:
+            fresh = True
+        elif header.get("digest") != _digest(path, old_size):
+            store = None  # edited somewhere the head/tail hashes do not cover
+        elif st.st_size > old_size:
+            if compression_of(path) is None:
+                store = _extend_store(store, header["tail_start"])
+            else:  # offsets are in decompressed bytes; just rebuild
+                store = None
+        # else touched, not changed: rewrite the sidecar with the new mtime
+    if store is None:
+        store = load_store(path)
+    if keywords and store.keywords is None:
+        store.keywords = KeywordIndex.build(store)
+        fresh = False
+    if not fresh:
+        _try_write_index(store, idx, st)
+    if rollups:
+        store.rollups = Rollups.build(store)
+    return store
+
+
+def _extend_store(store: EntryStore, tail_start: int) -> EntryStore:
+    """
+    Parse what was appended after `tail_start` (the last partial line is
+    re-read); the caller has checked that the bytes before it are unchanged.
+    """
+    offsets = store.offset
+    grown = store.select([i for i in range(len(store)) if offsets[i] < tail_start])
+    parse = LineParser()
+    for offset, raw in iter_raw_lines(store.path, start=tail_start):
+        e = parse(raw.decode("utf-8", errors="replace"))
+        if e:
+            grown.append(e, offset, len(raw))
+    return grown.sort()
+
+
+def _try_write_index(store: EntryStore, idx: Path, st: os.stat_result) -> None:
+    try:
+        write_index(store, idx, st)
+    except OSError as exc:
+        print(f"loglens: could not write {idx}: {exc}", file=sys.stderr)
+
+
+class KeywordMatcher:
+    """
+    All keywords compiled into one trie-shaped regex (shared prefixes become
+    one branch), so each message is lower-cased once and scanned once.
+    match() returns the keyword found leftmost (longest on ties), which lets
+    callers group results by keyword. Same substring semantics as
+    `k.lower() in message.lower()`.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(keywords)
+        self._by_lower: Dict[str, str] = {}
+        for k in self.keywords:
+            self._by_lower.setdefault(k.lower(), k)
+        self._search = re.compile(_trie_pattern(self._by_lower)).search
+
+    def match(self, text: str) -> Optional[str]:
+        m = self._search(text.lower())
+        return None if m is None else self._by_lower[m.group(0)]
+
+    def __call__(self, text: str) -> bool:
+        return self._search(text.lower()) is not None
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: Dict[str, Dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Dict]) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # a word ending here is a prefix of longer ones; prefer the longer match
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
 
 
 def filter_entries(
@@ -133,78 +2354,931 @@ def filter_entries(
     keywords: Optional[List[str]] = None,
     request_id: Optional[str] = None,
     min_latency: Optional[int] = None,
-) -> List[LogEntry]:
-    lvset = {lv.upper() for lv in (levels or [])}
-    kw = [k.lower() for k in (keywords or [])]
-    out: List[LogEntry] = []
-    for e in entries:
-        if since and e.ts < since:
-            continue
-        if until and e.ts > until:
-            continue
-        if lvset and e.level.upper() not in lvset:
-            continue
-        if request_id and (e.request_id or "") != request_id:
-            continue
-        if min_latency is not None and (e.latency_ms or -1) < min_latency:
-            continue
-        if kw and not any(k in (e.message.lower()) for k in kw):
+) -> Iterable[LogEntry]:
+    """Lazily filter a stream of entries; an EntryStore is filtered on its columns."""
+    if isinstance(entries, EntryStore):
+        return entries.filter(since, until, levels, keywords, request_id, min_latency)
+    return _filter_iter(entries, since, until, levels, keywords, request_id, min_latency)
+
+
+def _filter_iter(
+    entries: Iterable[LogEntry],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    levels: Optional[List[str]] = None,
+    keywords: Optional[List[str]] = None,
+    request_id: Optional[str] = None,
+    min_latency: Optional[int] = None,
+) -> Iterator[LogEntry]:
+    return filter(EntryFilter(since, until, levels, keywords, request_id, min_latency), entries)
+
+
+class EntryFilter:
+    """
+    filter_entries()'s conditions as a predicate, so they can run inside the
+    aggregation loop (or be pickled to a worker) instead of as a separate
+    generator stage. An empty filter is falsy.
+    """
+
+    def __init__(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        levels: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+        request_id: Optional[str] = None,
+        min_latency: Optional[int] = None,
+    ):
+        self.since, self.until = since, until
+        self.lvset = {lv.upper() for lv in (levels or [])}
+        self.keywords = list(keywords or [])
+        self.request_id = request_id
+        self.min_latency = min_latency
+        self._match = KeywordMatcher(self.keywords) if self.keywords else None
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.since or self.until or self.lvset or self.keywords
+            or self.request_id or self.min_latency is not None
+        )
+
+    def __getstate__(self):
+        # the compiled matcher is rebuilt on the other side
+        return {k: v for k, v in self.__dict__.items() if k != "_match"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._match = KeywordMatcher(self.keywords) if self.keywords else None
+
+    def __call__(self, e: LogEntry) -> bool:
+        if self.since and e.ts < self.since:
+            return False
+        if self.until and e.ts > self.until:
+            return False
+        if self.lvset and e.level.upper() not in self.lvset:
+            return False
+        if self.request_id and (e.request_id or "") != self.request_id:
+            return False
+        if self.min_latency is not None and (e.latency_ms or -1) < self.min_latency:
+            return False
+        if self._match is not None and not self._match(e.message):
+            return False
+        return True
+
+
+LATENCY_ERROR = 0.01  # default rank error of the latency sketch (fraction of n)
+
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch (Karnin, Lang & Liberty, 2016).
+    Values are kept in levels where an item at level h stands for 2**h
+    originals; when the sketch outgrows its capacity the lowest full level is
+    sorted and every other item (random offset) moves up one level. Memory is
+    O(k log(n / k)) with k ~ 1.65 / error, and a quantile is off by at most
+    about error * n ranks with high probability. Answers are exact until the
+    first compaction (the first k values).
+    """
+
+    __slots__ = ("k", "n", "levels", "_caps", "_size", "_limit", "_rng")
+
+    def __init__(self, error: float = LATENCY_ERROR, seed: int = 0):
+        if not 0 < error < 1:
+            raise ValueError("sketch error must be in (0, 1)")
+        self.k = max(8, math.ceil(1.65 / error))
+        self.n = 0
+        self.levels: List[List] = []
+        self._size = 0
+        self._add_level()
+        self._rng = random.Random(seed)  # fixed seed: the same input gives the same answers
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _add_level(self) -> None:
+        # the top level holds k items, each one below it 2/3 as many (at least 8)
+        self.levels.append([])
+        depth = len(self.levels)
+        self._caps = [max(8, int(self.k * (2 / 3) ** (depth - h - 1))) for h in range(depth)]
+        self._limit = sum(self._caps)
+
+    def add(self, value) -> None:
+        self.levels[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._limit:
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self._add_level()
+        for level, items in zip(self.levels, other.levels):
+            level.extend(items)
+        self.n += other.n
+        self._size += other._size
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        while self._size >= self._limit:
+            # lowest level over its capacity (the top one if none is)
+            h = next((h for h, level in enumerate(self.levels) if len(level) >= self._caps[h]), len(self.levels) - 1)
+            if h + 1 == len(self.levels):
+                self._add_level()
+            level = self.levels[h]
+            level.sort()
+            keep = [level.pop()] if len(level) % 2 else []
+            promoted = level[self._rng.getrandbits(1)::2]
+            self.levels[h + 1].extend(promoted)
+            self._size -= len(level) - len(promoted)
+            level[:] = keep
+
+    def quantile(self, q: float):
+        """Value at rank int(q * (n - 1)), the rule summarize() uses on a sorted list."""
+        if not self.n:
+            return None
+        rank = int(q * (self.n - 1))
+        seen = 0
+        for value, weight in sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level):
+            seen += weight
+            if seen > rank:
+                return value
+        return value
+
+
+HIST_PRECISION = 7  # log-linear histogram: 2**6 buckets per power of two (values within 1/64)
+HIST_MAX_BITS = 32  # latencies up to 2**32 ms; larger ones land in the top bucket
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of integer latencies in one fixed-size
+    array: values below 2**precision get a bucket each, above that every power
+    of two is split into 2**(precision - 1) buckets, so a bucket's values are
+    within 1/2**(precision - 1) of each other. Histograms of equal precision
+    merge by adding their arrays.
+    """
+
+    __slots__ = ("precision", "counts", "total")
+
+    def __init__(self, precision: int = HIST_PRECISION, max_bits: int = HIST_MAX_BITS):
+        self.precision = precision
+        size = ((max_bits - precision) << (precision - 1)) + (1 << precision)
+        self.counts = array("Q", bytes(8 * size))
+        self.total = 0
+
+    def bucket(self, value: int) -> int:
+        value = max(value, 0)  # a negative latency is a clock glitch: count it as 0
+        shift = value.bit_length() - self.precision
+        if shift <= 0:
+            return value
+        return min((shift << (self.precision - 1)) + (value >> shift), len(self.counts) - 1)
+
+    def bucket_high(self, idx: int) -> int:
+        """Largest value that falls in bucket `idx`."""
+        p = self.precision
+        if idx < 1 << p:
+            return idx
+        shift = (idx >> (p - 1)) - 1
+        return ((idx - (shift << (p - 1)) + 1) << shift) - 1
+
+    def add(self, value: int, count: int = 1) -> None:
+        self.counts[self.bucket(int(value))] += count
+        self.total += count
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.total += other.total
+        return self
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Bucket (upper bound) holding rank int(q * (n - 1)), like summarize()'s rule."""
+        if not self.total:
+            return None
+        rank = int(q * (self.total - 1))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen > rank:
+                return self.bucket_high(i)
+        return None
+
+    def max(self) -> Optional[int]:
+        for i in range(len(self.counts) - 1, -1, -1):
+            if self.counts[i]:
+                return self.bucket_high(i)
+        return None
+
+
+def _store_histograms(store: EntryStore) -> Tuple[LatencyHistogram, Dict[datetime, LatencyHistogram]]:
+    overall = LatencyHistogram()
+    minutes: Dict[int, LatencyHistogram] = {}
+    for ts, lat in zip(store.ts, store.latency):
+        if lat == NO_LATENCY:
             continue
-        out.append(e)
-    return out
+        overall.add(lat)
+        key = ts - ts % _MINUTE_US
+        hist = minutes.get(key)
+        if hist is None:
+            hist = minutes[key] = LatencyHistogram()
+        hist.add(lat)
+    return overall, {from_epoch_us(k): h for k, h in sorted(minutes.items())}
+
+
+@dataclass
+class Profile:
+    """
+    One-pass aggregates over a stream of entries (what summarize/diff report).
+    Entries may arrive in file order; finish() reorders the counters as if the
+    stream had been sorted by time, so ties in most_common() stay stable.
+    `messages` counts template ids of `normalizer` (TEMPLATES by default);
+    message_counts() resolves them to text. Latencies go to `latency_sketch`
+    when one is given, else into the exact `latencies` list; with
+    `latency_hist` set they are also binned overall and per minute.
+    """
+    total: int = 0
+    by_level: Counter = field(default_factory=Counter)
+    messages: Counter = field(default_factory=Counter)
+    latencies: List[int] = field(default_factory=list)
+    per_min: Dict[datetime, int] = field(default_factory=lambda: defaultdict(int))
+    first_seen: Dict[str, Tuple[datetime, int]] = field(default_factory=dict)
+    normalizer: Optional["TemplateTable"] = field(default=None, repr=False)
+    template_text: Optional[Callable[[int], str]] = field(default=None, repr=False)
+    latency_sketch: Optional[KLLSketch] = field(default=None, repr=False)
+    latency_hist: Optional[LatencyHistogram] = field(default=None, repr=False)
+    latency_by_min: Dict[datetime, LatencyHistogram] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        if self.template_text is None:
+            self.template_text = (self.normalizer or TEMPLATES).text
+        sketch = self.latency_sketch
+        self._add_latency = sketch.add if sketch is not None else self.latencies.append
+        self._last_minute: Optional[datetime] = None
+
+    def add(self, e: LogEntry) -> None:
+        # hot loop of stats/diff: first-seen bookkeeping is inlined and the
+        # current minute is memoized (entries mostly arrive in time order)
+        seq = self.total
+        self.total += 1
+        ts, level = e.ts, e.level
+        self.by_level[level] += 1
+        first_seen = self.first_seen
+        key = ("level", level)
+        first = first_seen.get(key)
+        if first is None or ts < first[0]:
+            first_seen[key] = (ts, seq)
+        if self.normalizer is None:
+            tid = e.template_id
+            if tid is None:
+                tid = e.template_id = TEMPLATES.id_for(e.message)
+        else:
+            tid = self.normalizer.id_for(e.message)
+        self.messages[tid] += 1
+        key = ("msg", tid)
+        first = first_seen.get(key)
+        if first is None or ts < first[0]:
+            first_seen[key] = (ts, seq)
+        if e.latency_ms is not None:
+            self._add_latency(e.latency_ms)
+            if self.latency_hist is not None:
+                self._bin_latency(ts, e.latency_ms)
+        if level in WARN_LEVELS:
+            self.per_min[self._minute(ts)] += 1
+
+    def _minute(self, ts: datetime) -> datetime:
+        minute = self._last_minute
+        if minute is None or not minute <= ts < minute + _ONE_MINUTE:
+            minute = self._last_minute = truncate_to_minute(ts)
+        return minute
+
+    def _bin_latency(self, ts: datetime, lat: int) -> None:
+        self.latency_hist.add(lat)
+        minute = self._minute(ts)
+        hist = self.latency_by_min.get(minute)
+        if hist is None:
+            hist = self.latency_by_min[minute] = LatencyHistogram()
+        hist.add(lat)
+
+    def merge(self, other: "Profile") -> "Profile":
+        """
+        Fold in the profile of the entries that follow this one's in the
+        stream (e.g. the next chunk of a file); call finish() afterwards.
+        Template ids must mean the same thing on both sides, so profiles from
+        other processes go through with_text_keys() first.
+        """
+        offset = self.total
+        self.total += other.total
+        self.by_level.update(other.by_level)
+        self.messages.update(other.messages)
+        for key, (ts, seq) in other.first_seen.items():
+            first = self.first_seen.get(key)
+            if first is None or ts < first[0]:
+                self.first_seen[key] = (ts, seq + offset)
+        if self.latency_sketch is not None and other.latency_sketch is not None:
+            self.latency_sketch.merge(other.latency_sketch)
+        else:
+            self.latencies.extend(other.latencies)
+        for minute, n in other.per_min.items():
+            self.per_min[minute] = self.per_min.get(minute, 0) + n
+        if self.latency_hist is not None and other.latency_hist is not None:
+            self.latency_hist.merge(other.latency_hist)
+            for minute, hist in other.latency_by_min.items():
+                mine = self.latency_by_min.get(minute)
+                if mine is None:
+                    self.latency_by_min[minute] = hist
+                else:
+                    mine.merge(hist)
+        return self
+
+    def with_text_keys(self) -> "Profile":
+        """Re-key `messages` by template text, which (unlike ids) means the same in every process."""
+        messages: Counter = Counter()
+        first_seen = {k: v for k, v in self.first_seen.items() if k[0] != "msg"}
+        for tid, n in self.messages.items():
+            text = self.template_text(tid)
+            messages[text] += n
+            key, first = ("msg", text), self.first_seen[("msg", tid)]
+            if key not in first_seen or first < first_seen[key]:
+                first_seen[key] = first
+        self.messages, self.first_seen = messages, first_seen
+        self.normalizer, self.template_text = None, str
+        return self
+
+    def finish(self) -> "Profile":
+        self.by_level = _time_ordered(self.by_level, self.first_seen, "level")
+        self.messages = _time_ordered(self.messages, self.first_seen, "msg")
+        self.latencies.sort()
+        self.latency_by_min = dict(sorted(self.latency_by_min.items()))
+        # merged from several files, minutes arrive out of order
+        self.per_min = defaultdict(int, sorted(self.per_min.items()))
+        return self
+
+    def latency_count(self) -> int:
+        if self.latency_sketch is not None:
+            return len(self.latency_sketch)
+        return len(self.latencies)
+
+    def percentile(self, q: float):
+        """Latency at rank int(q * (n - 1)); approximate when a sketch is used."""
+        if self.latency_sketch is not None:
+            return self.latency_sketch.quantile(q)
+        lat = self.latencies
+        k = int(q * (len(lat) - 1))
+        if hasattr(lat, "partition"):  # numpy column: O(n) selection, no full sort
+            lat.partition(k)
+            return int(lat[k])
+        return lat[k]
+
+    def message_counts(self) -> Counter:
+        """Counts per template text, resolved now (mined templates can still generalize)."""
+        out: Counter = Counter()
+        for tid, n in self.messages.items():
+            out[self.template_text(tid)] += n
+        return out
+
+    def set_store_messages(
+        self, store: EntryStore, groups: Iterable[Tuple[int, int, int]], normalizer=None
+    ) -> None:
+        """Fill `messages` from (template code, count, first row) groups, in first-row order."""
+        if normalizer is None:
+            self.messages = Counter({code: n for code, n, _ in groups})
+            self.template_text = store.templates.__getitem__
+            return
+        # mine one original message per regex template rather than every row
+        self.messages = Counter()
+        for code, n, row in groups:
+            self.messages[normalizer.id_for(store.message(row))] += n
+        self.normalizer, self.template_text = normalizer, normalizer.text
+
+    @classmethod
+    def of(
+        cls,
+        entries: Iterable[LogEntry],
+        normalizer=None,
+        latency_error: Optional[float] = None,
+        histograms: bool = False,
+    ) -> "Profile":
+        """
+        `latency_error` switches latencies to a KLLSketch (stores stay exact:
+        their column is already in memory); `histograms` adds latency_hist
+        and latency_by_min.
+        """
+        if isinstance(entries, Profile):
+            return entries
+        if isinstance(entries, EntryStore):
+            prof = cls.of_store(entries, normalizer)
+            if histograms:
+                prof.latency_hist, prof.latency_by_min = _store_histograms(entries)
+            return prof
+        sketch = KLLSketch(latency_error) if latency_error is not None else None
+        hist = LatencyHistogram() if histograms else None
+        prof = cls(normalizer=normalizer, latency_sketch=sketch, latency_hist=hist)
+        for e in entries:
+            prof.add(e)
+        return prof.finish()
+
+    @classmethod
+    def of_store(cls, store: EntryStore, normalizer=None) -> "Profile":
+        """Aggregate straight from the columns; counters follow row order."""
+        if store.index is not None:
+            return store.index.profile(store, normalizer)
+        prof = cls()
+        prof.total = len(store)
+        np = _numpy()
+        if np is not None and len(store):
+            # bincount/partition over the columns instead of Python loops
+            codes, counts, _ = _np_code_counts(_np_column(store.level))
+            prof.by_level = Counter({store.level_names[c]: n for c, n in zip(codes, counts)})
+            prof.set_store_messages(store, zip(*_np_code_counts(_np_column(store.tpl))), normalizer)
+            lat = _np_column(store.latency)
+            prof.latencies = lat[lat != NO_LATENCY]  # a copy; percentile() partitions it in place
+            prof.per_min = store.warn_minutes()
+            return prof
+        prof.by_level = Counter({store.level_names[c]: n for c, n in Counter(store.level).items()})
+        counts, first = Counter(store.tpl), {}
+        for i, code in enumerate(store.tpl):
+            first.setdefault(code, i)
+        prof.set_store_messages(store, ((c, counts[c], i) for c, i in first.items()), normalizer)
+        prof.latencies = sorted(v for v in store.latency if v != NO_LATENCY)
+        prof.per_min = store.warn_minutes()
+        return prof
+
 
+def _time_ordered(counts: Counter, first_seen: Dict, kind: str) -> Counter:
+    return Counter({k: counts[k] for k in sorted(counts, key=lambda k: first_seen[(kind, k)])})
 
-def summarize(entries: List[LogEntry]) -> str:
-    if not entries:
+
+def _profile_range(task) -> Profile:
+    path, start, end, prefilter, where, latency_error, histograms = task
+    entries = parse_lines(iter_lines(path, start, end, prefilter))
+    prof = Profile.of(filter(where, entries) if where else entries, None, latency_error, histograms)
+    return prof.with_text_keys()
+
+
+def profile_file(
+    path: Path,
+    workers: int = 1,
+    prefilter: Optional[LinePrefilter] = None,
+    span: Optional[Tuple[int, int]] = None,
+    where: Optional[EntryFilter] = None,
+    normalizer=None,
+    latency_error: Optional[float] = None,
+    histograms: bool = False,
+) -> Profile:
+    """
+    Parse, filter and aggregate a file in one pass, without an intermediate
+    list of entries. With workers, each byte range is profiled in its own
+    process and only the (small) profiles come back to be merged, in file
+    order. Compressed files and a mining normalizer (whose templates depend
+    on everything seen before) stay serial.
+    """
+    if workers <= 1 or normalizer is not None or compression_of(path) is not None:
+        entries = iter_entries(path, workers=workers, prefilter=prefilter, span=span)
+        return Profile.of(filter(where, entries) if where else entries, normalizer, latency_error, histograms)
+    start, end = span or (0, path.stat().st_size)
+    ranges = chunk_ranges(path, max(workers, -(-(end - start) // CHUNK_BYTES)), (start, end))
+    tasks = [(path, a, b, prefilter, where, latency_error, histograms) for a, b in ranges]
+    return _merge_profiles(tasks, workers, latency_error, histograms)
+
+
+def profile_sources(
+    paths: Sequence[Path],
+    workers: int = 1,
+    prefilter: Optional[LinePrefilter] = None,
+    where: Optional[EntryFilter] = None,
+    normalizer=None,
+    latency_error: Optional[float] = None,
+    histograms: bool = False,
+) -> Profile:
+    """
+    profile_file() over several files. Aggregates do not depend on the order
+    entries arrive in, so with workers the chunks of every file are profiled
+    in the pool and merged in path order instead of being time-merged.
+    """
+    if len(paths) == 1:
+        return profile_file(paths[0], workers, prefilter, None, where, normalizer, latency_error, histograms)
+    if workers <= 1 or normalizer is not None:
+        entries = iter_sources(paths, workers=workers, prefilter=prefilter)
+        return Profile.of(filter(where, entries) if where else entries, normalizer, latency_error, histograms)
+    tasks = [
+        (path, a, b, prefilter, where, latency_error, histograms)
+        for path in paths for a, b in _source_ranges(path)
+    ]
+    return _merge_profiles(tasks, workers, latency_error, histograms)
+
+
+def _merge_profiles(tasks, workers: int, latency_error: Optional[float], histograms: bool) -> Profile:
+    prof = Profile(
+        template_text=str,
+        latency_sketch=KLLSketch(latency_error) if latency_error is not None else None,
+        latency_hist=LatencyHistogram() if histograms else None,
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_profile_range, tasks):
+            prof.merge(part)
+    return prof.finish()
+
+
+def summarize(
+    entries: Iterable[LogEntry],
+    normalizer=None,
+    latency_error: Optional[float] = LATENCY_ERROR,
+    percentiles: Sequence[float] = (),
+    by_minute: bool = False,
+    spikes: Optional[SpikeDetector] = None,
+) -> str:
+    """
+    Stats report; latency percentiles come from a sketch unless `latency_error`
+    is None. Extra `percentiles` (e.g. 99.9) and the per-minute latency table
+    are read from log-bucketed histograms. `spikes` replaces the default
+    (global median, per minute) spike rule.
+    """
+    return render_stats(stats_report(entries, normalizer, latency_error, percentiles, by_minute, spikes))
+
+
+def stats_report(
+    entries: Iterable[LogEntry],
+    normalizer=None,
+    latency_error: Optional[float] = LATENCY_ERROR,
+    percentiles: Sequence[float] = (),
+    by_minute: bool = False,
+    spikes: Optional[SpikeDetector] = None,
+) -> Dict:
+    """What summarize() prints, as plain data (see write_report()); every spike is included."""
+    prof = Profile.of(entries, normalizer, latency_error, histograms=bool(percentiles) or by_minute)
+    report: Dict = {"entries": prof.total}
+    if not prof.total:
+        return report
+    report["by_level"] = dict(prof.by_level.most_common())
+    report["top_messages"] = [
+        {"template": msg, "count": cnt} for msg, cnt in prof.message_counts().most_common(8)
+    ]
+    if prof.latency_count():
+        report["latency_ms"] = {f"p{q:g}": prof.percentile(q / 100) for q in (50, 95, 99)}
+    hist = prof.latency_hist
+    if percentiles and hist is not None and hist.total:
+        report["latency_percentiles_ms"] = {f"p{q:g}": hist.quantile(q / 100) for q in percentiles}
+    if by_minute and prof.latency_by_min:
+        report["latency_by_minute"] = [
+            {
+                "minute": _iso_z(minute), "n": h.total, "p50": h.quantile(0.5),
+                "p95": h.quantile(0.95), "p99": h.quantile(0.99), "max": h.max(),
+            }
+            for minute, h in prof.latency_by_min.items()
+        ]
+    report["spikes"] = _spike_records(_spikes_from_counts(prof.per_min, spikes), spikes)
+    return report
+
+
+def render_stats(report: Dict) -> str:
+    if not report["entries"]:
         return "No entries."
-    by_level = Counter(e.level for e in entries)
-    top_msgs = Counter(normalize_message(e.message) for e in entries).most_common(8)
-    latencies = [e.latency_ms for e in entries if e.latency_ms is not None]
-    lat_summary = ""
-    if latencies:
-        latencies.sort()
-        p50 = latencies[int(0.5 * (len(latencies)-1))]
-        p95 = latencies[int(0.95 * (len(latencies)-1))]
-        p99 = latencies[int(0.99 * (len(latencies)-1))]
-        lat_summary = f"\nLatency (ms): p50={p50}, p95={p95}, p99={p99}"
     out = []
-    out.append(f"Entries: {len(entries)}")
-    out.append("By level: " + ", ".join(f"{k}={v}" for k, v in by_level.most_common()))
-    if top_msgs:
+    out.append(f"Entries: {report['entries']}")
+    out.append("By level: " + ", ".join(f"{k}={v}" for k, v in report["by_level"].items()))
+    if report["top_messages"]:
         out.append("Top messages:")
-        for msg, cnt in top_msgs:
-            out.append(f"  - {cnt:>5} × {msg}")
-    if lat_summary:
-        out.append(lat_summary)
-    spikes = scan_spikes(entries)
-    if spikes:
+        for m in report["top_messages"]:
+            out.append(f"  - {m['count']:>5} × {m['template']}")
+    lat = report.get("latency_ms")
+    if lat:
+        out.append(f"\nLatency (ms): p50={lat['p50']}, p95={lat['p95']}, p99={lat['p99']}")
+    if "latency_percentiles_ms" in report:
+        out.append("Latency percentiles (ms, histogram): " + ", ".join(
+            f"{q}={v}" for q, v in report["latency_percentiles_ms"].items()
+        ))
+    if report.get("latency_by_minute"):
+        out.append("Latency by minute (ms): n, p50, p95, p99, max")
+        for r in report["latency_by_minute"]:
+            out.append(
+                f"  - {r['minute']} : {r['n']:>6} {r['p50']:>6} {r['p95']:>6}"
+                f" {r['p99']:>6} {r['max']:>6}"
+            )
+    if report["spikes"]:
         out.append("Spike minutes (ERROR/WARN):")
-        for ts_min, count, baseline in spikes[:10]:
-            out.append(f"  - {ts_min}Z : {count} (baseline≈{baseline:.1f}x)")
+        for sp in report["spikes"][:10]:
+            out.append(f"  - {sp['minute']} : {sp['count']} ({_spike_note(sp)})")
     return "\n".join(out)
 
 
+def _iso_z(ts: datetime) -> str:
+    return ts.isoformat().replace("+00:00", "") + "Z"
+
+
+def _spike_records(
+    spikes: List[Tuple[str, int, float]], detector: Optional["SpikeDetector"] = None
+) -> List[Dict]:
+    """Spike dicts; the score is "z_score" for the mad baseline, else "baseline_multiple"."""
+    key = "z_score" if detector is not None and detector.baseline == "mad" else "baseline_multiple"
+    return [{"minute": f"{ts}Z", "count": n, key: m} for ts, n, m in spikes]
+
+
+def _spike_note(sp: Dict) -> str:
+    if "z_score" in sp:
+        return f"z≈{sp['z_score']:.1f}"
+    return f"baseline≈{sp['baseline_multiple']:.1f}x"
+
+
+class LiveStats:
+    """
+    summarize()-style state for `tail`, updated one entry at a time: level and
+    template counts, latency quantiles from a value -> count map, and
+    ERROR/WARN minutes within a sliding window of log time. add() is O(1) and
+    render() does not depend on how many lines have been read so far.
+    """
+
+    def __init__(
+        self, window: timedelta = timedelta(minutes=60), normalizer=None, spikes: Optional[SpikeDetector] = None
+    ):
+        self.window = window
+        self.normalizer = normalizer or TEMPLATES
+        self.spikes = spikes
+        self.total = 0
+        self.by_level: Counter = Counter()
+        self.messages: Counter = Counter()
+        self.latencies: Counter = Counter()
+        self.per_min: Dict[datetime, int] = {}
+        self.latest: Optional[datetime] = None
+
+    def add(self, e: LogEntry) -> None:
+        self.total += 1
+        self.by_level[e.level] += 1
+        self.messages[self.normalizer.id_for(e.message)] += 1
+        if e.latency_ms is not None:
+            self.latencies[e.latency_ms] += 1
+        if self.latest is None or e.ts > self.latest:
+            self.latest = e.ts
+        if e.level in WARN_LEVELS:
+            minute = truncate_to_minute(e.ts)
+            self.per_min[minute] = self.per_min.get(minute, 0) + 1
+
+    def quantiles(self, qs: Sequence[float]) -> List:
+        """Same ranks as summarize(): the int(q * (n - 1))-th smallest value."""
+        n = sum(self.latencies.values())
+        ranks = [int(q * (n - 1)) for q in qs]
+        out, seen = [], 0
+        values = iter(sorted(self.latencies.items()))
+        value, count = None, 0
+        for rank in ranks:
+            while seen + count <= rank:
+                seen += count
+                value, count = next(values)
+            out.append(value)
+        return out
+
+    def report(self, path: Path, new_lines: int) -> Dict:
+        """Current state as plain data (see write_report()); render() formats it."""
+        report: Dict = {
+            "file": str(path),
+            "at": _iso_z(datetime.now(timezone.utc).replace(microsecond=0)),
+            "entries": self.total,
+            "new_lines": new_lines,
+        }
+        if not self.total:
+            return report
+        horizon = truncate_to_minute(self.latest - self.window)
+        for minute in [m for m in self.per_min if m < horizon]:
+            del self.per_min[minute]
+        report["by_level"] = dict(self.by_level.most_common())
+        report["top_messages"] = [
+            {"template": self.normalizer.text(tid), "count": cnt} for tid, cnt in self.messages.most_common(8)
+        ]
+        if self.latencies:
+            report["latency_ms"] = dict(zip(("p50", "p95", "p99"), self.quantiles((0.5, 0.95, 0.99))))
+        report["spike_window_min"] = int(self.window.total_seconds() // 60)
+        per_min = dict(sorted(self.per_min.items()))
+        report["spikes"] = _spike_records(_spikes_from_counts(per_min, self.spikes), self.spikes)
+        return report
+
+    def render(self, path: Path, new_lines: int) -> str:
+        report = self.report(path, new_lines)
+        if not report["entries"]:
+            return f"{path}: waiting for entries..."
+        out = [
+            f"{path} @ {report['at'][11:19]}Z  entries={report['entries']} (+{new_lines})",
+            "By level: " + ", ".join(f"{k}={v}" for k, v in report["by_level"].items()),
+            "Top messages:",
+        ]
+        for m in report["top_messages"]:
+            out.append(f"  - {m['count']:>5} × {m['template']}")
+        lat = report.get("latency_ms")
+        if lat:
+            out.append(f"Latency (ms): p50={lat['p50']}, p95={lat['p95']}, p99={lat['p99']}")
+        spikes, window = report["spikes"], report["spike_window_min"]
+        out.append(f"Spike minutes (ERROR/WARN, last {window} min):" if spikes else f"No spike minutes in the last {window} min.")
+        for sp in spikes[:5]:
+            out.append(f"  - {sp['minute']} : {sp['count']} ({_spike_note(sp)})")
+        return "\n".join(out)
+
+
+def tail(path: Path, interval: float, stats: LiveStats, from_start: bool = False, fmt: str = "text") -> None:
+    """
+    Follow `path` and redraw the live view every `interval` seconds until
+    interrupted; with fmt "json"/"ndjson" one JSON report per line instead.
+    """
+    clear = "\x1b[H\x1b[2J" if sys.stdout.isatty() and fmt == "text" else ""
+    parse = LineParser()
+    new_lines, next_draw = 0, 0.0
+    try:
+        for lines in follow(path, interval, from_start):
+            for line in lines:
+                e = parse(line) if line.strip() else None
+                if e:
+                    stats.add(e)
+            new_lines += len(lines)
+            now = time.monotonic()
+            if now < next_draw:  # batches of a backlog: redraw at most once per interval
+                continue
+            next_draw = now + interval
+            if fmt != "text":
+                print(json_dumps({"type": "tail", **stats.report(path, new_lines)}), flush=True)
+            else:
+                print(clear + stats.render(path, new_lines), end="\n" if clear else "\n\n", flush=True)
+            new_lines = 0
+    except KeyboardInterrupt:
+        pass
+
+
+NORMALIZE_CACHE_SIZE = 65536  # raw messages remembered by the template caches
+
+# hex-ish ids (6+ chars) first, then plain integers, in a single pass
+_NORMALIZE_RE = re.compile(r"(?P<id>\b(?i:[0-9a-f]){6,}\b)|\b\d+\b")
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_message(msg: str) -> str:
     # Collapse numbers/ids to reduce noise for top-message grouping
-    msg = re.sub(r"\b[0-9a-f]{6,}\b", "<id>", msg, flags=re.I)
-    msg = re.sub(r"\b\d+\b", "<n>", msg)
-    return msg.strip()
+    return _NORMALIZE_RE.sub(_normalize_token, msg).strip()
+
+
+def _normalize_token(m: "re.Match[str]") -> str:
+    return "<id>" if m.lastgroup == "id" else "<n>"
+
+
+class TemplateTable:
+    """
+    Interns message templates as small integer ids. Raw message -> id goes
+    through a bounded LRU, so repeated messages are normalized only once.
+    """
+
+    def __init__(self, normalize: Callable[[str], str] = normalize_message.__wrapped__,
+                 cache_size: int = NORMALIZE_CACHE_SIZE):
+        self.normalize = normalize
+        self.texts: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.id_for: Callable[[str], int] = lru_cache(maxsize=cache_size)(self._id_for)
+
+    def _id_for(self, msg: str) -> int:
+        tpl = self.normalize(msg)
+        tid = self._ids.get(tpl)
+        if tid is None:
+            tid = self._ids[tpl] = len(self.texts)
+            self.texts.append(tpl)
+        return tid
+
+    def text(self, tid: int) -> str:
+        return self.texts[tid]
+
+
+TEMPLATES = TemplateTable()
+
+
+# Drain masks: key=values, quoted values, UUIDs, IPs, paths, host names, hex ids, numbers
+_DRAIN_MASK_RE = re.compile(
+    r"(?P<v>(?<=\w=)[^\s,;)\]}]+)"
+    r"""|(?P<str>"[^"]*"|'[^']*')"""
+    r"|(?P<uuid>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b)"
+    r"|(?P<ip>\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b)"
+    r"|(?P<path>(?<![\w.])(?:/[\w.~%-]+)+/?)"
+    r"|(?P<host>\b[A-Za-z][\w-]*(?:\.[\w-]+)*\.[A-Za-z][\w-]*\b)"
+    r"|(?P<id>\b(?:0x)?(?i:[0-9a-f]){6,}\b)"
+    r"|(?P<n>\b\d+(?:\.\d+)?\b)"
+)
+_WILDCARD = "<*>"
+
+
+class DrainMiner:
+    """
+    Online template miner in the style of Drain (He et al., ICWS 2017), usable
+    wherever a TemplateTable is. Masked tokens are routed through a fixed-depth
+    tree (token count, then the first `depth` tokens) to a small leaf of
+    clusters; a message joins the most similar one (differing positions become
+    <*>) or starts a new cluster. Memory is bounded: at `max_clusters` a
+    message goes to its closest cluster in the leaf, or to a per-length
+    catch-all. Cluster ids are stable; their text may still generalize.
+    """
+
+    def __init__(
+        self,
+        depth: int = 2,
+        sim_threshold: float = 0.4,
+        max_children: int = 100,
+        max_clusters: int = 5000,
+        cache_size: int = NORMALIZE_CACHE_SIZE,
+    ):
+        self.depth = depth
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.clusters: List[List[str]] = []
+        self._root: Dict = {}
+        self._overflow: Dict[int, int] = {}
+        self.id_for: Callable[[str], int] = lru_cache(maxsize=cache_size)(self._id_for)
+
+    def text(self, tid: int) -> str:
+        return " ".join(self.clusters[tid])
+
+    def _id_for(self, msg: str) -> int:
+        tokens = _DRAIN_MASK_RE.sub(lambda m: f"<{m.lastgroup}>", msg).split()
+        leaf = self._leaf(tokens)
+        best, best_sim = -1, -1.0
+        for cid in leaf:
+            sim = _similarity(self.clusters[cid], tokens)
+            if sim > best_sim:
+                best, best_sim = cid, sim
+        if best >= 0 and (best_sim >= self.sim_threshold or len(self.clusters) >= self.max_clusters):
+            tpl = self.clusters[best]
+            for i, (a, b) in enumerate(zip(tpl, tokens)):
+                if a != b and a != _WILDCARD:
+                    tpl[i] = _WILDCARD
+            return best
+        if len(self.clusters) >= self.max_clusters:
+            cid = self._overflow.get(len(tokens))
+            if cid is None:
+                cid = self._overflow[len(tokens)] = len(self.clusters)
+                self.clusters.append([_WILDCARD] * len(tokens))
+            return cid
+        self.clusters.append(list(tokens))
+        leaf.append(len(self.clusters) - 1)
+        return len(self.clusters) - 1
+
+    def _leaf(self, tokens: List[str]) -> List[int]:
+        node = self._root.setdefault(len(tokens), {})
+        for tok in tokens[: self.depth]:
+            child = node.get(tok)
+            if child is None:
+                key = tok if len(node) < self.max_children else _WILDCARD
+                child = node.setdefault(key, {})
+            node = child
+        return node.setdefault(None, [])
+
+
+def _similarity(template: List[str], tokens: List[str]) -> float:
+    if not tokens:
+        return 1.0
+    return sum(1 for a, b in zip(template, tokens) if a == b and a != _WILDCARD) / len(tokens)
+
+
+def make_normalizer(name: str):
+    """None (the default regex TEMPLATES) or a fresh DrainMiner."""
+    if name == "drain":
+        return DrainMiner()
+    return None
+
+
+_ONE_MINUTE = timedelta(minutes=1)
 
 
 def truncate_to_minute(dt: datetime) -> datetime:
     return dt.replace(second=0, microsecond=0)
 
 
-def scan_spikes(entries: List[LogEntry]) -> List[Tuple[str, int, float]]:
+def scan_spikes(
+    entries: Iterable[LogEntry], detector: Optional["SpikeDetector"] = None
+) -> List[Tuple[str, int, float]]:
     """
     Find minutes where WARN+ERROR counts spike vs median.
     Returns list of (minute_iso, count, multiple_of_median) sorted desc.
+    With a `detector`, its bucket width and baseline are used instead; the
+    entries must then be in time order and are consumed as a stream.
     """
+    if isinstance(entries, EntryStore):
+        return _spikes_from_counts(entries.warn_minutes(), detector)
+    if detector is not None:
+        detector.reset()
+        for e in entries:
+            if e.level in WARN_LEVELS:
+                detector.add(e.ts)
+        return detector.finish()
     per_min = defaultdict(int)
     for e in entries:
-        if e.level in ("ERROR", "WARN", "WARNING"):
+        if e.level in WARN_LEVELS:
             m = truncate_to_minute(e.ts)
             per_min[m] += 1
+    return _spikes_from_counts(per_min)
+
+
+def _spikes_from_counts(
+    per_min: Dict[datetime, int],
+    detector: Optional["SpikeDetector"] = None,
+    threshold: float = 2.0,
+    min_count: int = 3,
+) -> List[Tuple[str, int, float]]:
+    if detector is not None:
+        return detector.scan(per_min)
     if not per_min:
         return []
     counts = list(per_min.values())
@@ -212,139 +3286,738 @@ def scan_spikes(entries: List[LogEntry]) -> List[Tuple[str, int, float]]:
     spikes = []
     for minute, cnt in per_min.items():
         multiple = cnt / med
-        if multiple >= 2.0 and cnt >= 3:
+        if multiple >= threshold and cnt >= min_count:
             spikes.append((minute.isoformat().replace("+00:00", ""), cnt, multiple))
     spikes.sort(key=lambda x: (-x[1], -x[2], x[0]))
     return spikes
 
 
-def diff_healthy_vs_failing(healthy: List[LogEntry], failing: List[LogEntry]) -> str:
-    if not healthy or not failing:
-        return "Need both healthy and failing logs."
+SPIKE_BASELINES = ("median", "ewma", "mad")
+
+
+class SpikeDetector:
+    """
+    WARN/ERROR spike detection over fixed-width time buckets, fed in time
+    order (add() per event, or scan() over precomputed counts).
+
+    baseline="median" is the classic rule: one median over the non-empty
+    buckets of the whole run, spike at >= threshold (2.0) times it. It needs
+    every bucket count, so it keeps O(buckets) memory.
+
+    The rolling baselines only look at earlier buckets, with empty buckets
+    counted as zeros, so a slowly rising error rate does not hide later
+    bursts and memory stays O(window):
+      - "ewma": exponentially weighted mean (weight `alpha` per bucket);
+        spike at >= threshold (2.0) times it.
+      - "mad": median and median absolute deviation of the last `window`
+        buckets; spike at >= threshold (3.5) robust z-scores above the
+        median (the MAD is floored at one event).
+    A bucket needs >= `min_count` events and, for the rolling baselines,
+    `warmup` earlier buckets (at most `window` for mad) to be reported.
+    Results are (bucket_iso, count, score), largest first; the score is the
+    multiple of the baseline, or the robust z-score for mad.
+    """
+
+    def __init__(
+        self,
+        width: timedelta = timedelta(minutes=1),
+        baseline: str = "median",
+        threshold: Optional[float] = None,
+        min_count: int = 3,
+        window: int = 60,
+        alpha: float = 0.2,
+        warmup: int = 5,
+    ):
+        if baseline not in SPIKE_BASELINES:
+            raise ValueError(f"unknown spike baseline {baseline!r}")
+        self.width_us = width // timedelta(microseconds=1)
+        if self.width_us <= 0:
+            raise ValueError("spike bucket width must be positive")
+        self.baseline = baseline
+        self.threshold = threshold if threshold is not None else (3.5 if baseline == "mad" else 2.0)
+        self.min_count = min_count
+        self.window = max(window, 1)
+        self.alpha = alpha
+        self.warmup = min(max(warmup, 1), self.window) if baseline == "mad" else max(warmup, 1)
+        self.reset()
+
+    def reset(self) -> None:
+        self._bucket: Optional[int] = None
+        self._count = 0
+        self._counts: Dict[int, int] = {}  # "median" only
+        self._ewma: Optional[float] = None
+        self._history = 0  # "ewma": buckets folded into the baseline so far
+        self._recent: deque = deque()
+        self._sorted: List[int] = []
+        self._spikes: List[Tuple[str, int, float]] = []
+
+    def add(self, ts: datetime, n: int = 1) -> None:
+        """Count `n` events at `ts`; timestamps must not go back by a bucket or more."""
+        self.add_bucket(to_epoch_us(ts) // self.width_us, n)
+
+    def add_bucket(self, bucket: int, n: int) -> None:
+        if self._bucket is None:
+            self._bucket = bucket
+        elif bucket != self._bucket:
+            if bucket < self._bucket:
+                raise ValueError("SpikeDetector input must be in time order")
+            self._close(self._bucket, self._count)
+            gap = bucket - self._bucket - 1
+            if gap:
+                self._skip(gap)
+            self._bucket, self._count = bucket, 0
+        self._count += n
+
+    def finish(self) -> List[Tuple[str, int, float]]:
+        if self._bucket is not None:
+            self._close(self._bucket, self._count)
+            self._bucket, self._count = None, 0
+        if self.baseline == "median":
+            counts = {self._stamp(b): n for b, n in self._counts.items()}
+            self._counts = {}
+            return _spikes_from_counts(counts, threshold=self.threshold, min_count=self.min_count)
+        spikes = sorted(self._spikes, key=lambda x: (-x[1], -x[2], x[0]))
+        self._spikes = []
+        return spikes
+
+    def scan(self, counts: Dict[datetime, int]) -> List[Tuple[str, int, float]]:
+        """Run over per-bucket (e.g. per-minute) counts, re-bucketed to this width; resets state."""
+        self.reset()
+        width = self.width_us
+        for ts, n in sorted(counts.items()):
+            if n:
+                self.add_bucket(to_epoch_us(ts) // width, n)
+        return self.finish()
+
+    def _stamp(self, bucket: int) -> datetime:
+        return from_epoch_us(bucket * self.width_us)
 
-    # Levels diff
-    lvl_h = Counter(e.level for e in healthy)
-    lvl_f = Counter(e.level for e in failing)
+    def _close(self, bucket: int, count: int) -> None:
+        if self.baseline == "median":
+            self._counts[bucket] = count
+            return
+        if self.baseline == "ewma":
+            base = self._ewma
+            if self._history >= self.warmup and count >= self.min_count and count >= self.threshold * max(base, 1):
+                self._report(bucket, count, count / max(base, 1))
+            self._ewma = count if base is None else base + self.alpha * (count - base)
+            self._history += 1
+            return
+        if len(self._recent) >= self.warmup and count >= self.min_count:
+            med = median(self._sorted)
+            mad = max(median(abs(x - med) for x in self._sorted) * 1.4826, 1)
+            z = (count - med) / mad
+            if z >= self.threshold:
+                self._report(bucket, count, z)
+        self._push(count)
+
+    def _skip(self, gap: int) -> None:
+        """`gap` empty buckets: zeros never spike, so only the baseline moves."""
+        if self.baseline == "ewma":
+            if self._ewma is not None:
+                self._ewma *= (1 - self.alpha) ** gap
+                self._history += gap
+        elif self.baseline == "mad":
+            for _ in range(min(gap, self.window)):
+                self._push(0)
+
+    def _push(self, count: int) -> None:
+        self._recent.append(count)
+        insort(self._sorted, count)
+        if len(self._recent) > self.window:
+            del self._sorted[bisect_left(self._sorted, self._recent.popleft())]
+
+    def _report(self, bucket: int, count: int, score: float) -> None:
+        stamp = self._stamp(bucket).isoformat().replace("+00:00", "")
+        self._spikes.append((stamp, count, score))
+
+
+def diff_healthy_vs_failing(
+    healthy: Iterable[LogEntry],
+    failing: Iterable[LogEntry],
+    normalizer=None,
+    latency_error: Optional[float] = LATENCY_ERROR,
+    spikes: Optional[SpikeDetector] = None,
+) -> str:
+    return render_diff(diff_report(healthy, failing, normalizer, latency_error, spikes))
+
+
+def diff_report(
+    healthy: Iterable[LogEntry],
+    failing: Iterable[LogEntry],
+    normalizer=None,
+    latency_error: Optional[float] = LATENCY_ERROR,
+    spikes: Optional[SpikeDetector] = None,
+) -> Dict:
+    """What diff_healthy_vs_failing() prints, as plain data, with complete message lists."""
+    # with a template miner both sides must share it, and texts are resolved
+    # only after both have been read
+    prof_h = Profile.of(healthy, normalizer, latency_error)
+    prof_f = Profile.of(failing, normalizer, latency_error)
+    if not prof_h.total or not prof_f.total:
+        return {"error": "Need both healthy and failing logs."}
 
     # Messages diff
-    msg_h = Counter(normalize_message(e.message) for e in healthy)
-    msg_f = Counter(normalize_message(e.message) for e in failing)
+    msg_h = prof_h.message_counts()
+    msg_f = prof_f.message_counts()
 
     new_msgs = [(m, c) for m, c in msg_f.items() if m not in msg_h]
     elevated_msgs = [(m, msg_f[m] - msg_h[m]) for m in msg_f if m in msg_h and msg_f[m] > msg_h[m]]
     new_msgs.sort(key=lambda x: -x[1])
     elevated_msgs.sort(key=lambda x: -x[1])
 
+    report: Dict = {
+        "levels": {
+            "healthy": dict(prof_h.by_level.most_common()),
+            "failing": dict(prof_f.by_level.most_common()),
+        },
+        "new_messages": [{"template": m, "count": c} for m, c in new_msgs],
+        "elevated_messages": [{"template": m, "increase": d} for m, d in elevated_msgs],
+    }
+
     # Latency compare
-    lat_h = [e.latency_ms for e in healthy if e.latency_ms is not None]
-    lat_f = [e.latency_ms for e in failing if e.latency_ms is not None]
-    lat_line = ""
-    if lat_h and lat_f:
-        lat_h.sort(), lat_f.sort()
-        p95_h = lat_h[int(0.95 * (len(lat_h)-1))]
-        p95_f = lat_f[int(0.95 * (len(lat_f)-1))]
-        lat_line = f"Latency p95: healthy={p95_h}ms → failing={p95_f}ms (Δ={p95_f - p95_h}ms)"
+    if prof_h.latency_count() and prof_f.latency_count():
+        p95_h = prof_h.percentile(0.95)
+        p95_f = prof_f.percentile(0.95)
+        report["latency_p95_ms"] = {"healthy": p95_h, "failing": p95_f, "delta": p95_f - p95_h}
 
     # Spike scan on failing
-    spikes_f = scan_spikes(failing)
+    report["spikes"] = _spike_records(_spikes_from_counts(prof_f.per_min, spikes), spikes)
+    return report
 
+
+def render_diff(report: Dict) -> str:
+    if "error" in report:
+        return report["error"]
     lines = []
     lines.append("=== Levels ===")
-    lines.append("Healthy: " + ", ".join(f"{k}={v}" for k, v in lvl_h.most_common()))
-    lines.append("Failing: " + ", ".join(f"{k}={v}" for k, v in lvl_f.most_common()))
+    lines.append("Healthy: " + ", ".join(f"{k}={v}" for k, v in report["levels"]["healthy"].items()))
+    lines.append("Failing: " + ", ".join(f"{k}={v}" for k, v in report["levels"]["failing"].items()))
     lines.append("")
     lines.append("=== New Messages in FAILING ===")
-    if new_msgs:
-        for m, c in new_msgs[:15]:
-            lines.append(f"  - {c:>5} × {m}")
+    if report["new_messages"]:
+        for m in report["new_messages"][:15]:
+            lines.append(f"  - {m['count']:>5} × {m['template']}")
     else:
         lines.append("  (none)")
     lines.append("")
     lines.append("=== Elevated Messages (more frequent in FAILING) ===")
-    if elevated_msgs:
-        for m, d in elevated_msgs[:15]:
-            lines.append(f"  - +{d:>4} × {m}")
+    if report["elevated_messages"]:
+        for m in report["elevated_messages"][:15]:
+            lines.append(f"  - +{m['increase']:>4} × {m['template']}")
     else:
         lines.append("  (none)")
     lines.append("")
-    if lat_line:
+    lat = report.get("latency_p95_ms")
+    if lat:
         lines.append("=== Latency ===")
-        lines.append(lat_line)
+        lines.append(
+            f"Latency p95: healthy={lat['healthy']}ms → failing={lat['failing']}ms (Δ={lat['delta']}ms)"
+        )
         lines.append("")
     lines.append("=== Spike Minutes in FAILING (WARN/ERROR) ===")
-    if spikes_f:
-        for ts_min, cnt, mult in spikes_f[:10]:
-            lines.append(f"  - {ts_min}Z : {cnt} events (~{mult:.1f}× baseline)")
+    if report["spikes"]:
+        for sp in report["spikes"][:10]:
+            if "z_score" in sp:
+                lines.append(f"  - {sp['minute']} : {sp['count']} events (z≈{sp['z_score']:.1f} above baseline)")
+            else:
+                lines.append(f"  - {sp['minute']} : {sp['count']} events (~{sp['baseline_multiple']:.1f}× baseline)")
     else:
         lines.append("  (none)")
     return "\n".join(lines)
 
 
+RESOLUTION_NAMES = {1: "1s", 10: "10s", 60: "1m", 300: "5m", 3600: "1h"}
+
+
+def timeline_report(
+    rollups: Rollups,
+    res: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    levels: Optional[List[str]] = None,
+    message: Optional[str] = None,
+) -> Dict:
+    """
+    One row per bucket (empty ones included) from the rollups: total and
+    per-level counts plus latency count/avg/max, or with `message` only the
+    count of entries whose template contains it.
+    """
+    report: Dict = {"resolution": RESOLUTION_NAMES.get(res, f"{res}s")}
+    extent = rollups.span(res)
+    if extent is None:
+        report["buckets"] = []
+        return report
+    lo, hi = rollups._bounds(res, since, until)
+    lo = extent[0] if lo is None else lo
+    hi = extent[1] if hi is None else hi
+    report["from"], report["until"] = _iso_z(rollups.stamp(res, lo)), _iso_z(rollups.stamp(res, hi))
+    rows = report["buckets"] = []
+    if message is not None:
+        needle = message.lower()
+        codes = [c for c, text in enumerate(rollups.templates) if needle in text.lower()]
+        counts = rollups.counts(res, since, until, templates=codes)
+        report["message"] = message
+        for b in range(lo, hi + 1):
+            key = rollups.stamp(res, b)
+            rows.append({"bucket": _iso_z(key), "matches": counts.get(key, 0)})
+        return report
+    names = [n for n in rollups.level_names if not levels or n.upper() in {lv.upper() for lv in levels}]
+    total = rollups.counts(res, since, until)
+    per_level = [rollups.counts(res, since, until, levels=[n]) for n in names]
+    latency = rollups.latencies(res, since, until)
+    for b in range(lo, hi + 1):
+        key = rollups.stamp(res, b)
+        n, lat_sum, lat_max = latency.get(key, (0, 0, None))
+        rows.append({
+            "bucket": _iso_z(key),
+            "total": total.get(key, 0),
+            "levels": {name: c.get(key, 0) for name, c in zip(names, per_level)},
+            "latency_n": n,
+            "latency_avg_ms": lat_sum / n if n else None,
+            "latency_max_ms": lat_max,
+        })
+    return report
+
+
+def render_timeline(report: Dict) -> str:
+    rows = report["buckets"]
+    if not rows:
+        return "No entries."
+    out = [f"Timeline {report['from']} .. {report['until']} ({report['resolution']} buckets)"]
+    if "message" in report:
+        out.append(f"{'bucket':<21} {'matches':>8}")
+        for r in rows:
+            out.append(f"{r['bucket']:<21} {r['matches']:>8}")
+        return "\n".join(out)
+    names = list(rows[0]["levels"])
+    out.append(
+        f"{'bucket':<21} {'total':>8}" + "".join(f" {n:>7}" for n in names)
+        + f" {'lat_n':>7} {'lat_avg':>8} {'lat_max':>8}"
+    )
+    for r in rows:
+        avg, top = r["latency_avg_ms"], r["latency_max_ms"]
+        out.append(
+            f"{r['bucket']:<21} {r['total']:>8}" + "".join(f" {c:>7}" for c in r["levels"].values())
+            + f" {r['latency_n']:>7} {'-' if avg is None else f'{avg:.1f}':>8} {'-' if top is None else top:>8}"
+        )
+    return "\n".join(out)
+
+
+def format_entry(e: LogEntry) -> str:
+    lat = f" latency={e.latency_ms}ms" if e.latency_ms is not None else ""
+    rid = f" req={e.request_id}" if e.request_id else ""
+    return f"{e.ts.isoformat().replace('+00:00','Z')} {e.level} {e.message}{rid}{lat}"
+
+
+def entry_record(e: LogEntry) -> Dict:
+    return {
+        "ts": e.ts.isoformat().replace("+00:00", "Z"),
+        "level": e.level,
+        "message": e.message,
+        "request_id": e.request_id,
+        "latency_ms": e.latency_ms,
+    }
+
+
+OUTPUT_FORMATS = ("text", "json", "ndjson")
+
+
+def write_report(report: Dict, kind: str, fmt: str, out=None) -> None:
+    """
+    "json": the report as one document. "ndjson": a {"type": kind} line with
+    its non-list fields, then one line per item of each list field, typed by
+    the field name (e.g. {"type": "spikes", "minute": ..., "count": ...}).
+    """
+    out = out or sys.stdout
+    if fmt == "json":
+        out.write(json_dumps(report) + "\n")
+        return
+    head = {"type": kind}
+    head.update((k, v) for k, v in report.items() if not isinstance(v, list))
+    out.write(json_dumps(head) + "\n")
+    for k, items in report.items():
+        if isinstance(items, list):
+            for item in items:
+                out.write(json_dumps({"type": k, **item}) + "\n")
+
+
+def write_entries(entries: Iterable[LogEntry], fmt: str, out=None, **extra) -> None:
+    """Entries one at a time, as an NDJSON line each or as the items of a JSON array; `extra` fields are added to every record."""
+    out = out or sys.stdout
+    if fmt == "ndjson":
+        for e in entries:
+            out.write(json_dumps({**entry_record(e), **extra}) + "\n")
+        return
+    sep = "["
+    for e in entries:
+        out.write(sep + json_dumps({**entry_record(e), **extra}))
+        sep = ",\n"
+    out.write("[]\n" if sep == "[" else "]\n")
+
+
+def group_by_keyword(
+    entries: Iterable[LogEntry], matcher: KeywordMatcher, limit: Optional[int]
+) -> List[Tuple[str, int, List[LogEntry]]]:
+    """(keyword, match count, earliest `limit` entries, or all if None) per keyword, most matches first."""
+    counts: Counter = Counter()
+    groups: Dict[str, List[LogEntry]] = defaultdict(list)
+    for e in entries:
+        kw = matcher.match(e.message)
+        if kw is None:
+            continue
+        counts[kw] += 1
+        group = groups[kw]
+        group.append(e)
+        if limit is not None and len(group) > 2 * limit + 64:  # keep memory bounded
+            groups[kw] = heapq.nsmallest(limit, group, key=lambda x: x.ts)
+    if limit is None:
+        return [(kw, n, sorted(groups[kw], key=lambda x: x.ts)) for kw, n in counts.most_common()]
+    return [
+        (kw, n, heapq.nsmallest(limit, groups[kw], key=lambda x: x.ts))
+        for kw, n in counts.most_common()
+    ]
+
+
 def parse_dt(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
     return parse_ts(value)
 
 
+def _add_spike_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--spike-baseline", choices=SPIKE_BASELINES, default="median",
+                        help="Spike baseline: global median (default), rolling ewma or rolling median/MAD")
+    parser.add_argument("--spike-width", type=int, default=1, help="Spike bucket width, minutes")
+    parser.add_argument("--spike-threshold", type=float, help="Multiple of baseline (median/ewma, 2.0) or robust z-score (mad, 3.5)")
+    parser.add_argument("--spike-min-count", type=int, default=3, help="Ignore buckets with fewer ERROR/WARN events")
+    parser.add_argument("--spike-window", type=int, default=60, help="Buckets in the rolling median/MAD window")
+    parser.add_argument("--spike-alpha", type=float, default=0.2, help="EWMA weight of the newest bucket")
+
+
+def _spike_detector(p: argparse.ArgumentParser, args) -> Optional[SpikeDetector]:
+    """None (the classic per-minute rule) unless a --spike-* option asks for more."""
+    if args.spike_width < 1:
+        p.error("--spike-width must be at least 1 minute")
+    if not 0 < args.spike_alpha <= 1:
+        p.error("--spike-alpha must be in (0, 1]")
+    if (args.spike_baseline, args.spike_width, args.spike_threshold, args.spike_min_count) == ("median", 1, None, 3):
+        return None
+    return SpikeDetector(
+        timedelta(minutes=args.spike_width), args.spike_baseline, args.spike_threshold,
+        args.spike_min_count, args.spike_window, args.spike_alpha,
+    )
+
+
+def _latency_error(p: argparse.ArgumentParser, args) -> Optional[float]:
+    """Rank error of the latency sketch, or None (exact) with --exact."""
+    if not 0 < args.latency_error < 1:
+        p.error("--latency-error must be in (0, 1)")
+    return None if args.exact else args.latency_error
+
+
+def _table_input(p: argparse.ArgumentParser, sources: Sequence[Path], store_flag: bool) -> Optional[str]:
+    """
+    "parquet" or "sqlite" when the sources are converted/ingested entries
+    rather than log files (None); mixing kinds, or --index/--columnar, is an error.
+    """
+    kinds = {"parquet" if is_parquet(s) else "sqlite" if is_sqlite(s) else None for s in sources}
+    if kinds == {None}:
+        return None
+    if len(kinds) > 1:
+        p.error("cannot mix log files, Parquet files and databases")
+    kind = kinds.pop()
+    if store_flag:
+        p.error(f"--index and --columnar do not apply to {kind} input")
+    if kind == "parquet" and _pyarrow() is None:
+        p.error("Parquet input needs the pyarrow package")
+    return kind
+
+
+def _diff_side(p: argparse.ArgumentParser, args, sources: Sequence[Path]) -> Iterable[LogEntry]:
+    kind = _table_input(p, sources, args.index or args.columnar)
+    if kind == "parquet":
+        return iter_parquet_sources(sources, messages=args.normalizer != "regex")
+    if kind == "sqlite":
+        return iter_sqlite_sources(sources, messages=args.normalizer != "regex")
+    if args.index:
+        return open_indexed(sources[0])
+    if args.columnar:
+        return load_store(sources[0])
+    if args.workers > 1 and args.normalizer == "regex":
+        # a shared template miner needs the entries; regex templates do not
+        return profile_sources(sources, args.workers, latency_error=_latency_error(p, args))
+    return iter_sources(sources, workers=args.workers)
+
+
 def main():
     p = argparse.ArgumentParser(description="LogLens — Root-Cause Log Explorer")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     # stats
     ps = sub.add_parser("stats", help="Show summary stats for a log file.")
-    ps.add_argument("--file", required=True, type=Path)
+    ps.add_argument("--file", required=True, type=Path, help="Log file, directory or glob")
     ps.add_argument("--since", help='ISO timestamp, e.g. "2025-11-08T13:00:00Z"')
     ps.add_argument("--until", help='ISO timestamp')
     ps.add_argument("--levels", nargs="*", help="Filter by levels, e.g. ERROR WARN INFO")
     ps.add_argument("--keywords", nargs="*", help="Filter by keyword(s)")
     ps.add_argument("--request-id", help="Filter by request id")
     ps.add_argument("--min-latency", type=int, help="Only entries with latency >= ms")
+    ps.add_argument("--workers", type=int, default=1, help="Parse with N processes")
+    ps.add_argument("--normalizer", choices=("regex", "drain"), default="regex", help="Message grouping for top messages")
+    ps.add_argument("--exact", action="store_true", help="Exact latency percentiles (sorts every value)")
+    ps.add_argument("--latency-error", type=float, default=LATENCY_ERROR, help="Rank error of the latency sketch")
+    ps.add_argument("--percentiles", nargs="*", type=float, default=[], help="Extra latency percentiles, e.g. 90 99.9")
+    ps.add_argument("--latency-by-minute", action="store_true", help="Per-minute latency percentiles")
+    ps.add_argument("--columnar", action="store_true", help="Load into a compact in-memory EntryStore")
+    ps.add_argument("--index", action="store_true", help="Use (and maintain) a .llidx sidecar index")
+    ps.add_argument("--seek", action="store_true", help="Binary-search --since/--until in a time-ordered file")
+    ps.add_argument("--seek-slack", type=float, default=60.0, help="Out-of-order tolerance for --seek, seconds")
+    _add_spike_args(ps)
+    ps.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: text, one JSON document, or NDJSON records")
 
     # filter
     pf = sub.add_parser("filter", help="Print matching log lines (after filters).")
-    pf.add_argument("--file", required=True, type=Path)
+    pf.add_argument("--file", required=True, type=Path, help="Log file, directory or glob")
     pf.add_argument("--since", help='ISO timestamp')
     pf.add_argument("--until", help='ISO timestamp')
     pf.add_argument("--levels", nargs="*", help="Levels")
     pf.add_argument("--keywords", nargs="*", help="Keywords")
     pf.add_argument("--request-id", help="Request id")
     pf.add_argument("--min-latency", type=int, help="Latency >= ms")
-    pf.add_argument("--limit", type=int, default=100, help="Max lines to print")
+    pf.add_argument("--limit", type=int, default=100, help="Max lines to print (negative: all)")
+    pf.add_argument("--group-by-keyword", action="store_true", help="Group matches by the keyword that hit (--limit per group)")
+    pf.add_argument("--workers", type=int, default=1, help="Parse with N processes")
+    pf.add_argument("--columnar", action="store_true", help="Load into a compact in-memory EntryStore")
+    pf.add_argument("--index", action="store_true", help="Use (and maintain) a .llidx sidecar index")
+    pf.add_argument("--seek", action="store_true", help="Binary-search --since/--until in a time-ordered file")
+    pf.add_argument("--seek-slack", type=float, default=60.0, help="Out-of-order tolerance for --seek, seconds")
+    pf.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: text lines, a JSON array, or NDJSON")
 
     # diff healthy vs failing
     pd = sub.add_parser("diff", help="Compare healthy vs failing logs.")
-    pd.add_argument("--healthy", required=True, type=Path)
-    pd.add_argument("--failing", required=True, type=Path)
+    pd.add_argument("--healthy", required=True, type=Path, help="Log file, directory or glob")
+    pd.add_argument("--failing", required=True, type=Path, help="Log file, directory or glob")
+    pd.add_argument("--workers", type=int, default=1, help="Parse with N processes")
+    pd.add_argument("--normalizer", choices=("regex", "drain"), default="regex", help="Message grouping for the diff")
+    pd.add_argument("--exact", action="store_true", help="Exact latency percentiles (sorts every value)")
+    pd.add_argument("--latency-error", type=float, default=LATENCY_ERROR, help="Rank error of the latency sketch")
+    pd.add_argument("--columnar", action="store_true", help="Load into a compact in-memory EntryStore")
+    pd.add_argument("--index", action="store_true", help="Use (and maintain) a .llidx sidecar index")
+    _add_spike_args(pd)
+    pd.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: text, one JSON document, or NDJSON records")
+
+    # timeline
+    pl = sub.add_parser("timeline", help="Counts and latency per time bucket, from precomputed rollups.")
+    pl.add_argument("--file", required=True, type=Path)
+    pl.add_argument("--since", help="ISO timestamp")
+    pl.add_argument("--until", help="ISO timestamp")
+    pl.add_argument("--resolution", choices=("auto", *RESOLUTION_NAMES.values()), default="auto",
+                    help="Bucket width (auto: finest that fits --max-buckets)")
+    pl.add_argument("--max-buckets", type=int, default=60, help="Rows for --resolution auto")
+    pl.add_argument("--levels", nargs="*", help="Level columns to show")
+    pl.add_argument("--message", help="Only count entries whose message template contains this text")
+    pl.add_argument("--index", action="store_true", help="Use (and maintain) a .llidx sidecar index")
+    pl.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: text, one JSON document, or NDJSON rows")
+
+    # convert
+    pc = sub.add_parser("convert", help="Parse logs once and save the entries as Parquet (needs pyarrow).")
+    pc.add_argument("--file", required=True, type=Path, help="Log file, directory or glob")
+    pc.add_argument("--to", choices=("parquet",), default="parquet", help="Output format")
+    pc.add_argument("--out", required=True, type=Path, help="Output file, e.g. app.parquet")
+    pc.add_argument("--workers", type=int, default=1, help="Parse with N processes")
+    pc.add_argument("--row-group-size", type=int, default=PARQUET_ROW_GROUP, help="Rows per row group")
+    pc.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: a summary line, or {rows, out} as JSON/NDJSON")
+
+    # ingest
+    pi = sub.add_parser("ingest", help="Parse logs once and append the entries to a SQLite database.")
+    pi.add_argument("--file", required=True, type=Path, help="Log file, directory or glob")
+    pi.add_argument("--db", required=True, type=Path, help="Database file (created if missing)")
+    pi.add_argument("--workers", type=int, default=1, help="Parse with N processes")
+    pi.add_argument("--batch-size", type=int, default=DB_BATCH, help="Rows per insert transaction")
+    pi.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: a summary line, or {rows, out} as JSON/NDJSON")
+
+    # tail
+    pt = sub.add_parser("tail", help="Follow a growing log file with live stats.")
+    pt.add_argument("--file", required=True, type=Path)
+    pt.add_argument("--interval", type=float, default=2.0, help="Seconds between redraws")
+    pt.add_argument("--window", type=int, default=60, help="Spike window, minutes of log time")
+    pt.add_argument("--from-start", action="store_true", help="Read the existing contents first")
+    pt.add_argument("--normalizer", choices=("regex", "drain"), default="regex", help="Message grouping for top messages")
+    _add_spike_args(pt)
+    pt.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Output: redrawn text, or one JSON report per line")
 
     args = p.parse_args()
 
     if args.cmd in ("stats", "filter"):
-        entries = load_entries(args.file)
+        # Stream the file: stats never buffers entries, and filter only keeps
+        # the --limit earliest matches (heap) instead of sorting everything.
         since = parse_dt(args.since)
         until = parse_dt(args.until)
-        out = filter_entries(
-            entries,
-            since=since,
-            until=until,
-            levels=args.levels,
-            keywords=args.keywords,
-            request_id=args.request_id,
-            min_latency=args.min_latency,
-        )
+        prefilter = LinePrefilter.build(args.levels, since, until)
+        if args.cmd == "stats" and not all(0 <= q <= 100 for q in args.percentiles):
+            p.error("--percentiles must be between 0 and 100")
+        sources = expand_sources(args.file)
+        if not sources:
+            p.error(f"--file {args.file}: no files match")
+        if len(sources) > 1 and (args.index or args.columnar):
+            p.error("--index and --columnar take a single file")
+        table = _table_input(p, sources, args.index or args.columnar)
+        path = sources[0]
+        span = None
+        if args.seek and len(sources) == 1 and not (args.index or table) and compression_of(path) is None:
+            span = seek_time_range(path, since, until, timedelta(seconds=args.seek_slack))
+        multi = len(sources) > 1 and not table
+        if multi:
+            # whole files outside the window are skipped instead of seeking
+            sources = prune_sources(sources, since, until, timedelta(seconds=args.seek_slack))
         if args.cmd == "stats":
-            print(summarize(out))
+            normalizer = make_normalizer(args.normalizer)
+            latency_error = _latency_error(p, args)
+            histograms = bool(args.percentiles) or args.latency_by_minute
+        if args.cmd == "stats" and not (args.index or args.columnar or table):
+            # filter inside the aggregation loop (per worker with --workers)
+            where = EntryFilter(since, until, args.levels, args.keywords, args.request_id, args.min_latency)
+            if not multi:
+                out = profile_file(path, args.workers, prefilter, span, where, normalizer, latency_error, histograms)
+            else:
+                out = profile_sources(sources, args.workers, prefilter, where, normalizer, latency_error, histograms)
         else:
-            for e in out[: args.limit]:
-                lat = f" latency={e.latency_ms}ms" if e.latency_ms is not None else ""
-                rid = f" req={e.request_id}" if e.request_id else ""
-                print(
-                    f"{e.ts.isoformat().replace('+00:00','Z')} {e.level} {e.message}{rid}{lat}"
+            # stats with the regex templates only needs the template column
+            messages = args.cmd == "filter" or bool(args.keywords) or args.normalizer != "regex"
+            if table == "parquet":
+                entries = iter_parquet_sources(sources, since=since, until=until, levels=args.levels, messages=messages)
+            elif table == "sqlite":
+                # every filter (keywords via a SQL function) goes into the WHERE
+                # clause, so a plain filter can stop after --limit rows
+                limit = args.limit if args.cmd == "filter" and args.limit >= 0 and not args.group_by_keyword else None
+                entries = iter_sqlite_sources(
+                    sources, since=since, until=until, levels=args.levels, request_id=args.request_id,
+                    min_latency=args.min_latency, keywords=args.keywords, messages=messages, limit=limit,
                 )
+            elif multi:
+                entries = iter_sources(sources, args.workers, prefilter)
+            elif args.index:
+                entries = open_indexed(path, keywords=bool(args.keywords))
+            elif args.columnar:
+                entries = load_store(path, prefilter=prefilter, span=span)
+            else:
+                entries = iter_entries(path, workers=args.workers, prefilter=prefilter, span=span)
+            out = filter_entries(
+                entries,
+                since=since,
+                until=until,
+                levels=args.levels,
+                keywords=args.keywords,
+                request_id=args.request_id,
+                min_latency=args.min_latency,
+            )
+        if args.cmd == "stats":
+            report = stats_report(
+                out, normalizer, latency_error,
+                percentiles=args.percentiles, by_minute=args.latency_by_minute,
+                spikes=_spike_detector(p, args),
+            )
+            if args.format == "text":
+                print(render_stats(report))
+            else:
+                write_report(report, "stats", args.format)
+        else:
+            limit = args.limit if args.limit >= 0 else None  # negative: no limit
+            if args.group_by_keyword and args.keywords:
+                matcher = KeywordMatcher(args.keywords)
+                groups = group_by_keyword(out, matcher, limit)
+                if args.format == "json":
+                    write_report({"groups": [
+                        {"keyword": kw, "count": count, "entries": [entry_record(e) for e in group]}
+                        for kw, count, group in groups
+                    ]}, "filter", "json")
+                    return
+                for kw, count, group in groups:
+                    if args.format == "ndjson":
+                        write_entries(group, "ndjson", keyword=kw)
+                        continue
+                    print(f"=== {kw}: {count} ===")
+                    for e in group:
+                        print(format_entry(e))
+                return
+            if isinstance(out, EntryStore):
+                shown = (out.entry(i) for i in range(len(out))[:limit])
+            elif limit is not None:
+                shown = heapq.nsmallest(limit, out, key=lambda x: x.ts)
+            else:
+                shown = sorted(out, key=lambda x: x.ts)
+            if args.format != "text":
+                write_entries(shown, args.format)
+                return
+            for e in shown:
+                print(format_entry(e))
+
+    elif args.cmd == "convert":
+        sources = expand_sources(args.file)
+        if not sources:
+            p.error(f"--file {args.file}: no files match")
+        if _table_input(p, sources, False):
+            p.error("--file must be log files")
+        if _pyarrow() is None:
+            p.error("convert needs the pyarrow package")
+        # files are not assumed time-ordered: row groups should cover disjoint time ranges
+        rows = write_parquet_sorted(
+            iter_sources(sources, workers=args.workers), args.out, max(args.row_group_size, 1)
+        )
+        if args.format == "text":
+            print(f"Wrote {rows} entries to {args.out}")
+        else:
+            write_report({"rows": rows, "out": str(args.out)}, "convert", args.format)
+
+    elif args.cmd == "ingest":
+        sources = expand_sources(args.file)
+        if not sources:
+            p.error(f"--file {args.file}: no files match")
+        if _table_input(p, sources, False):
+            p.error("--file must be log files")
+        rows = ingest_sqlite(iter_sources(sources, workers=args.workers), args.db, max(args.batch_size, 1))
+        if args.format == "text":
+            print(f"Ingested {rows} entries into {args.db}")
+        else:
+            write_report({"rows": rows, "out": str(args.db)}, "ingest", args.format)
+
+    elif args.cmd == "timeline":
+        sources = expand_sources(args.file)
+        if len(sources) != 1:
+            p.error("timeline takes a single file")
+        if _table_input(p, sources, False):
+            p.error("timeline reads log files, not Parquet files or databases")
+        store = open_indexed(sources[0], rollups=True) if args.index else load_store(sources[0], rollups=True)
+        since, until = parse_dt(args.since), parse_dt(args.until)
+        if args.resolution == "auto":
+            res = store.rollups.resolution_for(since, until, args.max_buckets)
+        else:
+            res = next(r for r, name in RESOLUTION_NAMES.items() if name == args.resolution)
+        report = timeline_report(store.rollups, res, since, until, args.levels, args.message)
+        if args.format == "text":
+            print(render_timeline(report))
+        else:
+            write_report(report, "timeline", args.format)
+
+    elif args.cmd == "tail":
+        stats = LiveStats(timedelta(minutes=args.window), make_normalizer(args.normalizer), _spike_detector(p, args))
+        tail(args.file, args.interval, stats, from_start=args.from_start, fmt=args.format)
 
     elif args.cmd == "diff":
-        h = load_entries(args.healthy)
-        f = load_entries(args.failing)
-        print(diff_healthy_vs_failing(h, f))
+        normalizer = make_normalizer(args.normalizer)
+        healthy, failing = expand_sources(args.healthy), expand_sources(args.failing)
+        if not healthy or not failing:
+            p.error("--healthy/--failing: no files match")
+        if (len(healthy) > 1 or len(failing) > 1) and (args.index or args.columnar):
+            p.error("--index and --columnar take a single file")
+        h, f = _diff_side(p, args, healthy), _diff_side(p, args, failing)
+        latency_error = _latency_error(p, args)
+        report = diff_report(h, f, normalizer, latency_error, _spike_detector(p, args))
+        if args.format == "text":
+            print(render_diff(report))
+        else:
+            write_report(report, "diff", args.format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+import gzip
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+
+def _bgzf(data: bytes, block: int) -> bytes:
+    """BGZF container: one gzip member per `block` bytes (cut mid-line), then the empty EOF member."""
+    out = []
+    for i in range(0, len(data), block):
+        chunk = data[i: i + block]
+        c = zlib.compressobj(6, zlib.DEFLATED, -15)
+        cdata = c.compress(chunk) + c.flush()
+        head = b"\x1f\x8b\x08\x04" + b"\0\0\0\0\0\xff" + struct.pack("<HBBHH", 6, 66, 67, 2, 18 + len(cdata) + 8 - 1)
+        out.append(head + cdata + struct.pack("<II", zlib.crc32(chunk), len(chunk)))
+    out.append(bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000"))
+    return b"".join(out)
+
+
+class CompressedInputTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        d = Path(self.tmp.name)
+        text = "".join(
+            f"2025-11-08T13:{i // 60 % 60:02d}:{i % 60:02d}.000Z {('INFO', 'WARN', 'ERROR')[i % 3]} "
+            f"order {i} req=r{i % 97} latency={i % 500}ms\n"
+            for i in range(3000)
+        ).encode()
+        self.plain = d / "app.log"
+        self.plain.write_bytes(text)
+        self.bgzf = d / "app.log.bgz"
+        self.bgzf.write_bytes(_bgzf(text, 1000))
+        self.gz = d / "app.log.gz"
+        self.gz.write_bytes(gzip.compress(text))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bgzf_members_are_found(self):
+        blocks = loglens.compressed_blocks(self.bgzf, "gzip")
+        self.assertEqual(len(blocks), -(-self.plain.stat().st_size // 1000) + 1)
+        self.assertEqual(blocks[-1][1], self.bgzf.stat().st_size)
+        self.assertIsNone(loglens.compressed_blocks(self.gz, "gzip"))
+
+    def test_workers_match_plain(self):
+        expected = list(loglens.iter_entries(self.plain))
+        # a few members per task, so lines straddle task boundaries
+        with mock.patch.object(loglens, "CHUNK_BYTES", 8 * 2500):
+            for path in (self.bgzf, self.gz):
+                self.assertEqual(list(loglens.iter_entries(path, workers=2)), expected, path.name)
+                self.assertEqual(
+                    loglens.load_entries(path, workers=2), sorted(expected, key=lambda e: e.ts), path.name
+                )
+        self.assertEqual(list(loglens.iter_entries(self.bgzf)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
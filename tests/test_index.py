@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+
+def _lines(start, n, word):
+    return "".join(f"2025-11-08T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}.000Z INFO {word} {i}\n" for i in range(start, start + n))
+
+
+class SidecarStalenessTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = Path(self.tmp.name) / "app.log"
+        # large enough that the middle is outside the head/tail hashes
+        self.log.write_text(_lines(0, 80000, "alpha"))
+        loglens.open_indexed(self.log)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def edit_middle(self):
+        data = bytearray(self.log.read_bytes())
+        mid = data.index(b"INFO alpha 60000")
+        data[mid: mid + 4] = b"WARN"
+        self.log.write_bytes(bytes(data))
+        st = self.log.stat()
+        os.utime(self.log, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def levels(self):
+        store = loglens.open_indexed(self.log)
+        return Counter(store.level_names[c] for c in store.level)
+
+    def test_same_size_edit_in_the_middle(self):
+        self.edit_middle()
+        self.assertEqual(self.levels()["WARN"], 1)
+
+    def test_edit_in_the_middle_then_append(self):
+        self.edit_middle()
+        with self.log.open("a") as f:
+            f.write(_lines(80000, 10, "beta"))
+        self.assertEqual(self.levels(), Counter(INFO=80009, WARN=1))
+
+    def test_append_extends(self):
+        with self.log.open("a") as f:
+            f.write(_lines(80000, 10, "beta"))
+        self.assertEqual(self.levels(), Counter(INFO=80010))
+
+
+class StringTableTest(unittest.TestCase):
+    def test_roundtrip_and_find(self):
+        values = ["r1", 77, "é", ["a", 1], "", "r1x", "r1"]
+        table = loglens.StringTable(*loglens.StringTable.pack(values))
+        self.assertEqual(list(table), values)
+        self.assertEqual(table[-1], "r1")
+        self.assertEqual(table.find("r1"), [0, 6])
+        self.assertEqual(table.find(""), [4])
+        self.assertEqual(table.find("77"), [])
+
+
+class KeywordIndexTest(unittest.TestCase):
+    MESSAGES = ["payment declined for order 17", "cache miss key=order:17", "GET /api/orders 503",
+                "Timeout talking to db.primary", "retry_after=12ms", "user 4 did thing"]
+
+    def test_index_matches_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = Path(tmp) / "app.log"
+            filler = [f"user {i} did thing" for i in range(200)]
+            log.write_text("".join(
+                f"2025-11-08T13:{i // 60:02d}:{i % 60:02d}.000Z INFO {m}\n"
+                for i, m in enumerate(self.MESSAGES + filler)
+            ))
+            for keywords in (["order"], ["r 17"], ["order:1", "/api/"], ["db.p"], ["=12"], ["timeout t"],
+                             ["er 1", "did"], ["::"], ["17 "]):
+                expected = [m for m in self.MESSAGES + filler if any(k.lower() in m.lower() for k in keywords)]
+                for _ in range(2):  # fresh index, then the one read back from the sidecar
+                    store = loglens.open_indexed(log, keywords=True)
+                    got = [e.message for e in store.filter(keywords=keywords)]
+                    self.assertEqual(got, expected, keywords)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+T0 = datetime(2025, 11, 8, 13, 30, 1, tzinfo=timezone.utc)
+
+# format -> (line, (level, message, request_id, latency_ms))
+SAMPLES = {
+    "jsonl": ('{"timestamp": "2025-11-08T13:30:01Z", "level": "warn", "message": "cache miss", '
+              '"request_id": "r1", "latency_ms": 12}',
+              ("WARN", "cache miss", "r1", 12)),
+    "text": ("2025-11-08T13:30:01Z ERROR db timeout req=r2 latency=812ms",
+             ("ERROR", "db timeout req=r2 latency=812ms", "r2", 812)),
+    "logfmt": ('ts=2025-11-08T13:30:01Z level=warn msg="slow \\"query\\"" request_id=r3 duration=1.5s',
+               ("WARN", 'slow "query"', "r3", 1500)),
+    "syslog": ('<11>1 2025-11-08T13:30:01Z host app 123 ID47 [meta request_id="r4"] payment failed latency=40ms',
+               ("ERROR", "payment failed latency=40ms", "r4", 40)),
+    "nginx": ('10.0.0.1 - - [08/Nov/2025:14:30:01 +0100] "GET /api/orders?id=1 HTTP/1.1" 503 12 "-" "curl/8" '
+              'request_time=0.250 request_id=r5',
+              ("ERROR", "GET /api/orders 503", "r5", 250)),
+    "envoy": ('[2025-11-08T13:30:01.000Z] "POST /pay HTTP/1.1" 404 - 10 20 35 30 "10.0.0.2" "curl/8" "r6" '
+              '"pay.local" "10.0.0.3:80"',
+              ("WARN", "POST /pay 404", "r6", 35)),
+}
+
+
+class ParserTest(unittest.TestCase):
+    def test_sample_per_format(self):
+        for fmt, (line, want) in SAMPLES.items():
+            e = loglens.parse_line(line)
+            self.assertIsNotNone(e, fmt)
+            self.assertEqual(e.ts, T0, fmt)
+            self.assertEqual((e.level, e.message, e.request_id, e.latency_ms), want, fmt)
+
+    def test_at_most_one_parser_accepts(self):
+        # the dispatch order must not matter: every line has at most one taker
+        lines = [line for line, _ in SAMPLES.values()] + [
+            "level=info msg=2025-11-08T13:30:01Z",
+            "2025-11-08T13:30:01Z INFO a=b ts=2025-11-08T13:30:01Z",
+            '2025-11-08T13:30:01Z - - [08/Nov/2025:14:30:01 +0100] "GET / HTTP/1.1" 200 1',
+            '[2025-11-08T13:30:01Z] INFO {"level": "warn"}',
+            "<11>1 2025-11-08T13:30:01Z host app - - -",
+            "not a log line",
+        ]
+        for line in lines:
+            takers = [name for name, parse in loglens.PARSERS.items() if parse(line)]
+            self.assertLessEqual(len(takers), 1, (line, takers))
+
+    def test_line_parser_follows_format_changes(self):
+        parse = loglens.LineParser()
+        lines = [line for line, _ in SAMPLES.values()] * 2
+        self.assertEqual([parse(line) for line in lines], [loglens.parse_line(line) for line in lines])
+
+
+if __name__ == "__main__":
+    unittest.main()
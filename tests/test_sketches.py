@@ -0,0 +1,104 @@
+import random
+import sys
+import unittest
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+QUANTILES = (0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0)
+
+
+def _rank_error(truth, value, q):
+    """Distance, in ranks, from the target rank to where `value` sits in the sorted truth."""
+    rank = int(q * (len(truth) - 1))
+    lo, hi = bisect_left(truth, value), bisect_right(truth, value) - 1
+    return max(lo - rank, rank - hi, 0)
+
+
+class KLLSketchTest(unittest.TestCase):
+    def test_exact_until_first_compaction(self):
+        rng = random.Random(1)
+        values = [rng.randrange(1000) for _ in range(100)]
+        sketch = loglens.KLLSketch(error=0.01)
+        for v in values:
+            sketch.add(v)
+        truth = sorted(values)
+        for q in QUANTILES:
+            self.assertEqual(sketch.quantile(q), truth[int(q * (len(truth) - 1))])
+
+    def test_rank_error_after_merge(self):
+        rng = random.Random(7)
+        error = 0.01
+        # differently shaped parts, as from files or workers with different traffic
+        parts = [
+            [int(rng.lognormvariate(4 + i / 4, 1)) for _ in range(20000 + 3000 * i)]
+            for i in range(8)
+        ]
+        merged = loglens.KLLSketch(error=error)
+        for i, values in enumerate(parts):
+            sketch = loglens.KLLSketch(error=error, seed=i)
+            for v in values:
+                sketch.add(v)
+            merged.merge(sketch)
+        truth = sorted(v for values in parts for v in values)
+        self.assertEqual(len(merged), len(truth))
+        for q in QUANTILES:
+            self.assertLessEqual(_rank_error(truth, merged.quantile(q), q), error * len(truth), q)
+
+    def test_merge_into_empty(self):
+        sketch = loglens.KLLSketch(error=0.05)
+        for v in range(5000):
+            sketch.add(v)
+        merged = loglens.KLLSketch(error=0.05).merge(sketch)
+        self.assertEqual(merged.quantile(0.5), sketch.quantile(0.5))
+        self.assertIsNone(loglens.KLLSketch().quantile(0.5))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.hist = loglens.LatencyHistogram()
+        self.last = len(self.hist.counts) - 1
+
+    def test_exact_below_128(self):
+        bucket = self.hist.bucket
+        self.assertEqual([bucket(v) for v in range(128)], list(range(128)))
+        self.assertEqual(self.hist.bucket_high(127), 127)
+        # from 128 on, 64 buckets per power of two: 128 and 129 share one
+        self.assertEqual((bucket(128), bucket(129), bucket(130)), (128, 128, 129))
+        self.assertEqual(self.hist.bucket_high(128), 129)
+        self.assertEqual(bucket(-5), 0)
+
+    def test_buckets_are_contiguous(self):
+        bucket, high = self.hist.bucket, self.hist.bucket_high
+        low = 0
+        for idx in range(self.last + 1):
+            self.assertEqual(bucket(low), idx)
+            self.assertEqual(bucket(high(idx)), idx)
+            self.assertLessEqual(high(idx) - low, low // 64)  # within 1/64
+            low = high(idx) + 1
+
+    def test_top_bucket_at_2_32(self):
+        bucket = self.hist.bucket
+        self.assertEqual(self.hist.bucket_high(self.last), 2**32 - 1)
+        self.assertEqual(bucket(2**32 - 1), self.last)
+        self.assertEqual(bucket(2**32), self.last)
+        self.assertEqual(bucket(2**40), self.last)
+        self.assertLess(bucket(2**31), self.last)
+
+    def test_merge_and_quantile(self):
+        a, b = loglens.LatencyHistogram(), loglens.LatencyHistogram()
+        for v in range(100):
+            a.add(v)
+        b.add(1000, count=100)
+        a.merge(b)
+        self.assertEqual(a.total, 200)
+        self.assertEqual(a.quantile(0.25), 49)
+        self.assertEqual(a.quantile(1.0), a.bucket_high(a.bucket(1000)))
+        self.assertEqual(a.max(), a.bucket_high(a.bucket(1000)))
+
+
+if __name__ == "__main__":
+    unittest.main()
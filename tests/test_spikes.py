@@ -0,0 +1,56 @@
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+T0 = datetime(2025, 11, 8, 13, 0, tzinfo=timezone.utc)
+
+
+class MedianSpikeTest(unittest.TestCase):
+    # medians of 4, one minute at 3x and one at 10x
+    COUNTS = [4, 4, 12, 4, 40, 4]
+
+    def spikes(self, **kw):
+        det = loglens.SpikeDetector(baseline="median", **kw)
+        for i, n in enumerate(self.COUNTS):
+            det.add(T0 + timedelta(minutes=i), n)
+        return [cnt for _, cnt, _ in det.finish()]
+
+    def test_defaults_match_the_classic_rule(self):
+        per_min = {T0 + timedelta(minutes=i): n for i, n in enumerate(self.COUNTS)}
+        self.assertEqual(self.spikes(), [c for _, c, _ in loglens._spikes_from_counts(per_min)])
+
+    def test_threshold_and_min_count_are_honoured(self):
+        self.assertEqual(self.spikes(threshold=5.0), [40])
+        self.assertEqual(self.spikes(min_count=50), [])
+
+
+class RollingSpikeTest(unittest.TestCase):
+    STEADY = [100, 106, 95, 104, 99, 101, 97, 105, 98, 103, 100, 96]
+
+    def scan(self, baseline, counts, **kw):
+        det = loglens.SpikeDetector(baseline=baseline, **kw)
+        return det.scan({T0 + timedelta(minutes=i): n for i, n in enumerate(counts)})
+
+    def test_steady_counts_do_not_spike_during_warmup(self):
+        for baseline in ("mad", "ewma"):
+            self.assertEqual(self.scan(baseline, self.STEADY), [], baseline)
+
+    def test_burst_after_warmup_is_reported(self):
+        for baseline in ("mad", "ewma"):
+            spikes = self.scan(baseline, self.STEADY + [400] + self.STEADY)
+            self.assertEqual([(ts, n) for ts, n, _ in spikes], [("2025-11-08T13:12:00", 400)], baseline)
+
+    def test_mad_reports_a_z_score(self):
+        (_, _, z), = self.scan("mad", self.STEADY + [400])
+        self.assertGreater(z, 20)
+        records = loglens._spike_records([("2025-11-08T13:12:00", 400, z)], loglens.SpikeDetector(baseline="mad"))
+        self.assertEqual(records[0]["z_score"], z)
+
+
+if __name__ == "__main__":
+    unittest.main()
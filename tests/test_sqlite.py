@@ -0,0 +1,45 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import loglens  # noqa: E402
+
+T0 = datetime(2025, 11, 8, 13, 0, tzinfo=timezone.utc)
+
+
+def _entries(messages):
+    return [loglens.LogEntry(T0 + timedelta(seconds=i), "INFO", m) for i, m in enumerate(messages)]
+
+
+class SqliteKeywordTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "logs.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def query(self, entries, keywords, limit):
+        loglens.ingest_sqlite(entries, self.db)
+        rows = loglens.iter_sqlite(self.db, keywords=keywords, limit=limit)
+        return [e.message for e in loglens.filter_entries(rows, keywords=keywords)]
+
+    def test_limit_with_non_ascii_keyword(self):
+        # the matches come after more than --limit non-matching rows
+        entries = _entries([f"noise {i}" for i in range(20)] + [f"Bärn request {i}" for i in range(10)])
+        self.assertEqual(self.query(entries, ["ärn"], 5), [f"Bärn request {i}" for i in range(5)])
+
+    def test_keyword_case_folding_matches_python(self):
+        entries = _entries(["Kelvin sign", "plain kelvin", "İstanbul", "unrelated"])
+        for kw in (["kelvin"], ["i̇stanbul"]):
+            expected = [e.message for e in loglens.filter_entries(entries, keywords=kw)]
+            self.db.unlink(missing_ok=True)
+            self.assertEqual(self.query(entries, kw, None), expected, kw)
+
+
+if __name__ == "__main__":
+    unittest.main()